@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Benchmark the trends pipeline and the search view against an in-process Elasticsearch stand-in.
+
+.. code-block:: console
+
+   $ python -m benchmarks --documents 20000 --vocabulary 20000 --bursts 5 --json results.json
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+from datetime import datetime
+from timeit import default_timer
+
+from flask import Flask
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_elasticsearch import FakeCluster, FakeConnection
+from invenio_trends import InvenioTrends, views
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.config import TRENDS_BACKGROUND_WINDOW, TRENDS_FOREGROUND_WINDOW, TRENDS_GRANULARITY, \
+    TRENDS_HIST_GRANULARITY, TRENDS_INDEX, TRENDS_MAXIMUM_CANDIDATES, TRENDS_MINIMUM_FREQUENCY_THRESHOLD, \
+    TRENDS_NUM, TRENDS_NUM_CLUSTER, TRENDS_PARAMS, TRENDS_SMOOTHING_LEN
+from invenio_trends.connections import ElasticsearchConnections
+from invenio_trends.single_flight import SingleFlight
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+trace_memory = False
+
+
+def traced(func, *args, **kwargs):
+    """Run func and return its result with a peak memory measure in bytes.
+
+    The measure is the peak of memory allocated during the call when tracing memory (precise but slowing down
+    execution), otherwise the peak resident set size of the whole process.
+    """
+    if not trace_memory or tracemalloc is None:
+        res = func(*args, **kwargs)
+        return res, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    tracemalloc.start()
+    try:
+        res = func(*args, **kwargs)
+        return res, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def fake_connections(cluster):
+    """Return the shared connections component set up on the fake cluster."""
+    return ElasticsearchConnections(None, connection_class=FakeConnection, cluster=cluster)
+
+
+def fake_client(cluster):
+    """Return a client to the fake cluster together with its request counter."""
+    connections = fake_connections(cluster)
+    return connections.client, connections.requests
+
+
+def bench_pipeline(cluster, reference_date):
+    """Run the whole pipeline once with the default configuration."""
+    client, counter = fake_client(cluster)
+    td = TrendsDetector(TRENDS_PARAMS, client=client, request_counter=counter)
+    trends, peak = traced(
+        td.run_pipeline,
+        reference_date=reference_date,
+        granularity=TRENDS_GRANULARITY,
+        foreground_window=TRENDS_FOREGROUND_WINDOW,
+        background_window=TRENDS_BACKGROUND_WINDOW,
+        minimum_frequency_threshold=TRENDS_MINIMUM_FREQUENCY_THRESHOLD,
+        smoothing_len=TRENDS_SMOOTHING_LEN,
+        num_cluster=TRENDS_NUM_CLUSTER,
+        num_trends=TRENDS_NUM,
+        maximum_candidates=TRENDS_MAXIMUM_CANDIDATES
+    )
+    report = td.report.to_dict()
+    report.update(peak_memory=peak, trends=[term for term, stats, hist in trends])
+    return report
+
+
+def bench_search(cluster, terms, repeat):
+    """Call the search view for given terms, without histogram cache."""
+    app = Flask('benchmark')
+    ext = InvenioTrends(app)
+    ext.elasticsearch = fake_connections(cluster)
+    counter = ext.elasticsearch.requests
+    views.histogram_cache, views.search_flight = None, SingleFlight()
+
+    times = []
+    peak = None
+    with app.test_request_context():
+        for i in range(repeat):
+            start = default_timer()
+            res, peak = traced(views.search, ','.join(terms), None, None, TRENDS_HIST_GRANULARITY)
+            times.append(default_timer() - start)
+    requests, size = counter.snapshot()
+    return {
+        'terms': terms,
+        'time': min(times),
+        'mean_time': sum(times) / len(times),
+        'requests': requests // repeat,
+        'bytes': size // repeat,
+        'response_bytes': len(res.get_data()),
+        'peak_memory': peak,
+    }
+
+
+# run in a fresh interpreter: time and peak resident set size of creating an app with the extension registered, and
+# the heavy modules it loaded (ru_maxrss survives fork and exec on linux, hence the high water mark of /proc first)
+STARTUP_SCRIPT = '''
+import json, re, resource, sys
+from timeit import default_timer
+start = default_timer()
+from flask import Flask
+from invenio_trends import InvenioTrends
+app = Flask('benchmark')
+InvenioTrends(app)
+elapsed = default_timer() - start
+try:
+    with open('/proc/self/status') as f:
+        peak = int(re.search(r'VmHWM:\\s+(\\d+) kB', f.read()).group(1)) * 1024
+except (IOError, AttributeError):
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+print(json.dumps({
+    'time': elapsed,
+    'peak_memory': peak,
+    'modules': [name for name in %r if name in sys.modules],
+}))
+'''
+HEAVY_MODULES = ['celery', 'scipy', 'sklearn']
+
+
+def bench_startup(repeat):
+    """Create an app with the extension registered in fresh interpreters, as web workers do."""
+    runs = [json.loads(subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT % HEAVY_MODULES]).decode('utf-8'))
+            for i in range(repeat)]
+    return {
+        'time': min(run['time'] for run in runs),
+        'mean_time': sum(run['time'] for run in runs) / len(runs),
+        'peak_memory': min(run['peak_memory'] for run in runs),
+        'heavy_modules': runs[0]['modules'],
+    }
+
+
+def print_results(results):
+    """Print results as tables."""
+    pipeline = results['pipeline']
+    print('pipeline: %.3fs, %s requests, %s bytes, peak memory %s bytes' % (
+        pipeline['time'], pipeline['requests'], pipeline['bytes'], pipeline['peak_memory']))
+    print('%-24s %10s %9s %12s %9s %9s' % ('stage', 'time', 'requests', 'bytes', 'in', 'out'))
+    for stage in pipeline['stages']:
+        print('%(stage)-24s %(time)10.4f %(requests)9d %(bytes)12d %(items_in)9s %(items_out)9s' % stage)
+    print('trends: %s' % ', '.join(pipeline['trends']))
+    search = results['search']
+    print('search %s terms: %.4fs (mean %.4fs), %s requests, %s bytes, response %s bytes, peak memory %s bytes' % (
+        len(search['terms']), search['time'], search['mean_time'], search['requests'], search['bytes'],
+        search['response_bytes'], search['peak_memory']))
+    startup = results['startup']
+    print('startup: %.4fs (mean %.4fs), peak memory %s bytes, heavy modules loaded: %s' % (
+        startup['time'], startup['mean_time'], startup['peak_memory'], ', '.join(startup['heavy_modules']) or 'none'))
+
+
+def main(argv=None):
+    """Generate a corpus, run benchmarks and report them."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=20000, help='number of documents')
+    parser.add_argument('--vocabulary', type=int, default=20000, help='number of distinct terms')
+    parser.add_argument('--days', type=int, default=400, help='number of days covered by documents')
+    parser.add_argument('--bursts', type=int, default=5, help='number of injected bursting terms')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the corpus')
+    parser.add_argument('--search-terms', type=int, default=5, help='number of terms per search')
+    parser.add_argument('--search-repeat', type=int, default=10, help='number of searches')
+    parser.add_argument('--startup-repeat', type=int, default=5, help='number of app startups')
+    parser.add_argument('--trace-memory', action='store_true', help='trace allocations (slower)')
+    parser.add_argument('--json', help='also write results into given file')
+    args = parser.parse_args(argv)
+
+    global trace_memory
+    trace_memory = args.trace_memory
+
+    reference_date = datetime(2016, 7, 1)
+    start = default_timer()
+    corpus, bursts = generate_corpus(args.documents, args.vocabulary, args.days, bursts=args.bursts,
+                                     end=reference_date, seed=args.seed)
+    cluster = FakeCluster()
+    cluster.add_index(TRENDS_INDEX, corpus)
+    print('corpus of %s documents generated in %.3fs' % (len(corpus), default_timer() - start))
+
+    results = {
+        'corpus': dict(vars(args), bursts=[term for term, date in bursts]),
+        'pipeline': bench_pipeline(cluster, reference_date),
+        'search': bench_search(cluster, [term for term, date in bursts][:args.search_terms] or ['topic 0'],
+                               args.search_repeat),
+        'startup': bench_startup(args.startup_repeat),
+    }
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
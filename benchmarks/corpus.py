@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Synthetic corpus generator."""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def generate_corpus(documents, vocabulary, days, bursts=0, burst_days=5, burst_rate=0.2, terms_per_document=40,
+                    end=datetime(2016, 7, 1), seed=0):
+    """Generate pre-analyzed (id, date, terms counter) documents spread uniformly over the days before end.
+
+    Terms are drawn from a Zipf-like distribution over the vocabulary. Each burst term appears in a fraction
+    burst_rate of the documents of burst_days consecutive days, randomly placed within the last two weeks.
+    Return the documents and the list of (burst term, burst start) pairs.
+    """
+    rng = np.random.RandomState(seed)
+    names = np.array(['topic %d' % i for i in range(vocabulary)])
+    weights = 1 / np.arange(1, vocabulary + 1) ** 1.1
+    weights /= weights.sum()
+
+    offsets = np.sort(rng.randint(0, days, size=documents))
+    dates = [end - timedelta(days=int(days - offset)) for offset in offsets]
+    draws = rng.choice(vocabulary, size=(documents, terms_per_document), p=weights)
+
+    corpus = [('%d' % i, date, Counter(names[draw].tolist())) for i, (date, draw) in enumerate(zip(dates, draws))]
+
+    injected = []
+    for burst in range(bursts):
+        term = 'burst %d' % burst
+        start = end - timedelta(days=int(rng.randint(burst_days, 14)))
+        injected.append((term, start))
+        for id, date, terms in corpus:
+            if start <= date < start + timedelta(days=burst_days) and rng.rand() < burst_rate:
+                terms[term] += 1
+    return corpus, injected
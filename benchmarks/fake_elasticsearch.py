@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""In-process Elasticsearch stand-in implementing the API surface used by invenio-trends.
+
+It plugs in as an elasticsearch-py connection class, so that clients, elasticsearch-dsl searches and scans run
+unchanged against synthetic in-memory indices:
+
+.. code-block:: python
+
+    cluster = FakeCluster()
+    cluster.add_index('records-trends', documents)
+    client = Elasticsearch(connection_class=FakeConnection, cluster=cluster)
+
+Supported requests are scan/scroll searches, mtermvectors, searches with filters, date_histogram, min and max
+aggregations, and _reindex. Queries are limited to bool filters, range, exists, match_phrase and match_all.
+"""
+
+import calendar
+import json
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import count
+
+import numpy as np
+from elasticsearch import Connection
+
+from invenio_trends.config import TRENDS_ANALYSIS_FIELD, TRENDS_DATE_FIELD, TRENDS_DOC_TYPE
+
+FIXED_INTERVALS = {
+    'second': timedelta(seconds=1),
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+def parse_date(value):
+    """Parse an ISO date, an ISO datetime or epoch milliseconds."""
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value / 1000)
+    value = value.rstrip('Z')
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError('cannot parse date %s' % value)
+
+
+def format_date(date):
+    """Format a date like the date_optional_time format of Elasticsearch."""
+    return date.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (date.microsecond // 1000)
+
+
+def epoch_millis(date):
+    """Return epoch milliseconds of given date."""
+    return calendar.timegm(date.timetuple()) * 1000 + date.microsecond // 1000
+
+
+def bin_start(date, interval):
+    """Return the start of the calendar bin of given interval containing date."""
+    if interval in FIXED_INTERVALS:
+        step = FIXED_INTERVALS[interval]
+        return datetime(1970, 1, 1) + step * ((date - datetime(1970, 1, 1)) // step)
+    day = datetime(date.year, date.month, date.day)
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    if interval == 'year':
+        return day.replace(month=1, day=1)
+    raise ValueError('unsupported interval %s' % interval)
+
+
+def next_bin(start, interval):
+    """Return the start of the bin following the one starting at start."""
+    if interval in FIXED_INTERVALS:
+        return start + FIXED_INTERVALS[interval]
+    if interval == 'week':
+        return start + timedelta(weeks=1)
+    if interval == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start.replace(year=start.year + 1)
+
+
+class FakeIndex:
+    """In-memory index of pre-analyzed documents sorted by date."""
+
+    def __init__(self, name, documents, doc_type=TRENDS_DOC_TYPE, date_field=TRENDS_DATE_FIELD,
+                 analysis_field=TRENDS_ANALYSIS_FIELD):
+        """Index (id, date, terms counter) documents."""
+        self.name = name
+        self.doc_type = doc_type
+        self.date_field = date_field
+        self.analysis_field = analysis_field
+        self.documents = sorted(documents, key=lambda doc: doc[1])
+        self.positions = dict((id, i) for i, (id, date, terms) in enumerate(self.documents))
+        self.dates = np.array([epoch_millis(date) for id, date, terms in self.documents], dtype=np.int64)
+
+        self.postings = {}
+        self.ttf = Counter()
+        for i, (id, date, terms) in enumerate(self.documents):
+            for term, freq in terms.items():
+                self.postings.setdefault(term, []).append(i)
+                self.ttf[term] += freq
+        self.postings = dict((term, np.array(docs)) for term, docs in self.postings.items())
+        self.bins = {}
+
+    def __len__(self):
+        """Return number of documents."""
+        return len(self.documents)
+
+    def select(self, query):
+        """Return boolean mask of documents matching query."""
+        mask = np.ones(len(self), dtype=bool)
+        if not query:
+            return mask
+        (kind, params), = query.items()
+        if kind == 'bool':
+            for clause in ('must', 'filter'):
+                clauses = params.get(clause, [])
+                for sub in clauses if isinstance(clauses, list) else [clauses]:
+                    mask &= self.select(sub)
+            clauses = params.get('must_not', [])
+            for sub in clauses if isinstance(clauses, list) else [clauses]:
+                mask &= ~ self.select(sub)
+        elif kind == 'range':
+            (field, bounds), = params.items()
+            for op, value in bounds.items():
+                if value is None or op not in ('gt', 'gte', 'lt', 'lte'):
+                    continue
+                value = epoch_millis(parse_date(value))
+                mask &= {'gt': np.greater, 'gte': np.greater_equal, 'lt': np.less,
+                         'lte': np.less_equal}[op](self.dates, value)
+        elif kind == 'match_phrase':
+            (field, term), = params.items()
+            mask[:] = False
+            mask[self.postings.get(term, [])] = True
+        elif kind not in ('match_all', 'exists', 'script'):
+            raise ValueError('unsupported query %s' % kind)
+        return mask
+
+    def histogram_bins(self, interval):
+        """Return (bin starts, bin of each document) for given interval, computed once."""
+        if interval not in self.bins:
+            starts = sorted(set(bin_start(date, interval) for id, date, terms in self.documents))
+            lookup = dict((start, i) for i, start in enumerate(starts))
+            bins = np.array([lookup[bin_start(date, interval)] for id, date, terms in self.documents], dtype=np.int64)
+            self.bins[interval] = starts, bins
+        return self.bins[interval]
+
+    def aggregate(self, mask, aggs):
+        """Compute aggregations over documents selected by mask."""
+        res = {}
+        for name, agg in aggs.items():
+            sub_aggs = agg.get('aggs', agg.get('aggregations', {}))
+            kind, = [key for key in agg if key not in ('aggs', 'aggregations')]
+            params = agg[kind]
+            if kind == 'filters':
+                res[name] = {'buckets': dict(
+                    (key, dict(self.aggregate(mask & self.select(query), sub_aggs),
+                               doc_count=int(np.sum(mask & self.select(query)))))
+                    for key, query in params['filters'].items()
+                )}
+            elif kind == 'date_histogram':
+                res[name] = {'buckets': self.date_histogram(mask, params['interval'])}
+            elif kind in ('min', 'max'):
+                dates = self.dates[mask]
+                value = float(dates.min() if kind == 'min' else dates.max()) if len(dates) else None
+                res[name] = {'value': value}
+                if value is not None:
+                    res[name]['value_as_string'] = format_date(parse_date(value))
+            else:
+                raise ValueError('unsupported aggregation %s' % kind)
+        return res
+
+    def date_histogram(self, mask, interval):
+        """Return date histogram buckets, filling empty bins between the first and last non-empty ones."""
+        starts, bins = self.histogram_bins(interval)
+        counts = np.bincount(bins[mask], minlength=len(starts))
+        nonzero = np.flatnonzero(counts)
+        if not len(nonzero):
+            return []
+        lookup = dict((start, i) for i, start in enumerate(starts))
+        buckets = []
+        start, last = starts[nonzero[0]], starts[nonzero[-1]]
+        while start <= last:
+            buckets.append({
+                'key_as_string': format_date(start),
+                'key': epoch_millis(start),
+                'doc_count': int(counts[lookup[start]]) if start in lookup else 0,
+            })
+            start = next_bin(start, interval)
+        return buckets
+
+    def term_vector(self, id):
+        """Return the term vector response of given document."""
+        pos = self.positions.get(id)
+        doc = {'_index': self.name, '_type': self.doc_type, '_id': id, 'found': pos is not None, 'term_vectors': {}}
+        if pos is not None:
+            doc['term_vectors'][self.analysis_field] = {'terms': dict(
+                (term, {'term_freq': freq, 'ttf': self.ttf[term], 'doc_freq': len(self.postings[term])})
+                for term, freq in self.documents[pos][2].items()
+            )}
+        return doc
+
+
+class FakeCluster:
+    """Set of fake indices together with the state of open scrolls."""
+
+    def __init__(self):
+        """Start an empty cluster."""
+        self.indices = {}
+        self.scrolls = {}
+        self.scroll_ids = count()
+
+    def add_index(self, name, documents, **kwargs):
+        """Create (or replace) an index holding given documents."""
+        self.indices[name] = FakeIndex(name, documents, **kwargs)
+        return self.indices[name]
+
+    def handle(self, method, path, params, body):
+        """Dispatch a request and return (status, response)."""
+        parts = [part for part in path.split('/') if part]
+        if parts[-1] == 'scroll' and parts[-2] == '_search':
+            if method == 'DELETE':
+                self.scrolls.clear()
+                return 200, {'succeeded': True}
+            scroll_id = body.get('scroll_id') if isinstance(body, dict) else body
+            return 200, self.next_page(scroll_id or params.get('scroll_id'))
+        if parts[0] == '_reindex':
+            return 200, self.reindex(body)
+
+        index = self.indices.get(parts[0])
+        if index is None:
+            return 404, {'error': 'index_not_found_exception', 'status': 404}
+        if parts[-1] == '_search':
+            return 200, self.search(index, params, body or {})
+        if parts[-1] == '_mtermvectors':
+            ids = params['ids'].split(',') if 'ids' in params else (body or {}).get('ids', [])
+            return 200, {'docs': [index.term_vector(id) for id in ids]}
+        return 400, {'error': 'unsupported request %s %s' % (method, path), 'status': 400}
+
+    def search(self, index, params, body):
+        """Run a search, opening a scroll if requested."""
+        mask = index.select(body.get('query'))
+        res = {
+            'took': 0,
+            'timed_out': False,
+            '_shards': {'total': 1, 'successful': 1, 'failed': 0},
+            'hits': {'total': int(np.sum(mask)), 'max_score': None, 'hits': []},
+        }
+        if 'aggs' in body or 'aggregations' in body:
+            res['aggregations'] = index.aggregate(mask, body.get('aggs', body.get('aggregations')))
+        size = int(params.get('size', body.get('size', 10)))
+        hits = [{'_index': index.name, '_type': index.doc_type, '_id': index.documents[i][0], '_score': None}
+                for i in np.flatnonzero(mask)]
+        if 'scroll' in params:
+            scroll_id = str(next(self.scroll_ids))
+            self.scrolls[scroll_id] = hits, size
+            res['_scroll_id'] = scroll_id
+            if params.get('search_type') != 'scan':
+                res.update(self.next_page(scroll_id))
+        else:
+            res['hits']['hits'] = hits[int(body.get('from', 0)):int(body.get('from', 0)) + size]
+        return res
+
+    def next_page(self, scroll_id):
+        """Return the next page of an open scroll."""
+        hits, size = self.scrolls.get(scroll_id, ([], 0))
+        self.scrolls[scroll_id] = hits[size:], size
+        return {
+            '_scroll_id': scroll_id,
+            '_shards': {'total': 1, 'successful': 1, 'failed': 0},
+            'hits': {'total': len(hits), 'hits': hits[:size]},
+        }
+
+    def reindex(self, body):
+        """Copy documents matching the source query into the destination index."""
+        source = self.indices[body['source']['index']]
+        mask = source.select(body['source'].get('query'))
+        dest = body['dest']['index']
+        existing = self.indices[dest].positions if dest in self.indices else {}
+        selected = [source.documents[i] for i in np.flatnonzero(mask)]
+        updated = sum(1 for id, date, terms in selected if id in existing)
+        kept = [doc for doc in self.indices[dest].documents if doc[0] not in source.positions] \
+            if dest in self.indices else []
+        self.add_index(dest, kept + selected, doc_type=source.doc_type, date_field=source.date_field,
+                       analysis_field=source.analysis_field)
+        return {'took': 0, 'timed_out': False, 'total': len(selected), 'created': len(selected) - updated,
+                'updated': updated, 'failures': []}
+
+
+class FakeConnection(Connection):
+    """Connection answering requests from a fake cluster, optionally counting them."""
+
+    def __init__(self, cluster=None, counter=None, **kwargs):
+        """Set up a connection to given cluster."""
+        kwargs.pop('maxsize', None)
+        super(FakeConnection, self).__init__(**kwargs)
+        self.cluster = cluster
+        self.counter = counter
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        """Answer request from the fake cluster."""
+        path, _, query = url.partition('?')
+        params = dict((key, value.decode('utf-8') if isinstance(value, bytes) else value)
+                      for key, value in (params or {}).items())
+        params.update(part.split('=', 1) for part in query.split('&') if '=' in part)
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        if body:
+            body = json.loads(body) if re.match(r'\s*[{\[]', body) else body
+
+        status, res = self.cluster.handle(method, path, params, body)
+        data = json.dumps(res)
+        if self.counter is not None:
+            self.counter.add(len(data))
+        if not (200 <= status < 300) and status not in ignore:
+            self._raise_error(status, data)
+        return status, {'content-type': 'application/json'}, data
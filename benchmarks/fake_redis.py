@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""In-process Redis stand-in implementing the commands used by invenio-trends.
+
+Values are stored as bytes with their expiration time, like a redis server would return them. Setting ``down``
+makes every command raise a connection error, as if the server were unreachable:
+
+.. code-block:: python
+
+    redis = FakeRedis()
+    redis.setex('key', 60, 'value')
+    redis.down = True
+"""
+
+import threading
+import time
+import uuid
+
+from redis.exceptions import ConnectionError, LockError
+
+
+def encode(value):
+    """Convert a value to bytes the way redis-py does."""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (int, float)):
+        return repr(value).encode('utf-8')
+    return value.encode('utf-8')
+
+
+class FakeLock:
+    """Lock held by setting a key to a random token, released only by its owner."""
+
+    def __init__(self, redis, name, timeout=None):
+        """Set up a lock on given key expiring after timeout seconds."""
+        self.redis = redis
+        self.name = name
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex.encode('utf-8')
+
+    def acquire(self, blocking=True):
+        """Try to take the lock, once if not blocking."""
+        while not self.redis.set(self.name, self.token, ex=self.timeout, nx=True):
+            if not blocking:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def release(self):
+        """Release the lock, failing if it expired or was taken by someone else."""
+        with self.redis.mutex:
+            self.redis.check()
+            if self.redis.lookup(self.name) != self.token:
+                raise LockError('cannot release a lock that is no longer owned')
+            del self.redis.data[encode(self.name)]
+
+
+class FakePipeline:
+    """Buffer of commands run at once on execute."""
+
+    def __init__(self, redis):
+        """Start an empty pipeline on given redis."""
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        """Buffer a call of given command, returning the pipeline to chain them."""
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return command
+
+    def execute(self):
+        """Run buffered commands and return their results."""
+        commands, self.commands = self.commands, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class FakeRedis:
+    """Thread safe in-memory strings, hashes and lists with expiration."""
+
+    def __init__(self):
+        """Start an empty server."""
+        self.mutex = threading.RLock()
+        self.data = {}
+        self.down = False
+        self.commands = 0
+
+    def check(self):
+        """Count a command, failing if the server is down."""
+        if self.down:
+            raise ConnectionError('fake redis is down')
+        self.commands += 1
+
+    def lookup(self, name):
+        """Return the value of given key or None if missing or expired."""
+        value, expires = self.data.get(encode(name), (None, None))
+        if expires is not None and expires <= time.time():
+            del self.data[encode(name)]
+            return None
+        return value
+
+    def store(self, name, value, ex=None):
+        """Store a value expiring after ex seconds if given."""
+        self.data[encode(name)] = value, time.time() + ex if ex is not None else None
+
+    def get(self, name):
+        """Return string value of given key."""
+        with self.mutex:
+            self.check()
+            return self.lookup(name)
+
+    def mget(self, keys, *args):
+        """Return string values of many keys."""
+        with self.mutex:
+            self.check()
+            return [self.lookup(key) for key in
+                    (list(keys) if isinstance(keys, (list, tuple)) else [keys]) + list(args)]
+
+    def set(self, name, value, ex=None, nx=False):
+        """Set string value of given key, only if missing when nx."""
+        with self.mutex:
+            self.check()
+            if nx and self.lookup(name) is not None:
+                return None
+            self.store(name, encode(value), ex)
+            return True
+
+    def setex(self, name, time, value):
+        """Set string value of given key expiring after time seconds."""
+        return self.set(name, value, ex=time)
+
+    def incr(self, name, amount=1):
+        """Increment integer value of given key."""
+        with self.mutex:
+            self.check()
+            value = int(self.lookup(name) or 0) + amount
+            self.store(name, encode(value))
+            return value
+
+    def delete(self, *names):
+        """Remove given keys."""
+        with self.mutex:
+            self.check()
+            return sum(1 for name in names if self.data.pop(encode(name), None) is not None)
+
+    def exists(self, *names):
+        """Return the number of given keys that exist."""
+        with self.mutex:
+            self.check()
+            return sum(1 for name in names if self.lookup(name) is not None)
+
+    def ttl(self, name):
+        """Return seconds to live of given key, -1 if persistent and -2 if missing."""
+        with self.mutex:
+            self.check()
+            if self.lookup(name) is None:
+                return -2
+            expires = self.data[encode(name)][1]
+            return -1 if expires is None else int(round(expires - time.time()))
+
+    def hmset(self, name, mapping):
+        """Set many fields of given hash."""
+        with self.mutex:
+            self.check()
+            hash = dict(self.lookup(name) or {})
+            hash.update((encode(field), encode(value)) for field, value in mapping.items())
+            self.store(name, hash)
+            return True
+
+    def hmget(self, name, keys, *args):
+        """Return values of many fields of given hash."""
+        with self.mutex:
+            self.check()
+            hash = self.lookup(name) or {}
+            return [hash.get(encode(key)) for key in
+                    (list(keys) if isinstance(keys, (list, tuple)) else [keys]) + list(args)]
+
+    def hgetall(self, name):
+        """Return all fields of given hash."""
+        with self.mutex:
+            self.check()
+            return dict(self.lookup(name) or {})
+
+    def lpush(self, name, *values):
+        """Prepend values to given list."""
+        with self.mutex:
+            self.check()
+            items = list(reversed([encode(value) for value in values])) + list(self.lookup(name) or [])
+            self.store(name, items)
+            return len(items)
+
+    def ltrim(self, name, start, end):
+        """Keep the elements of given list between start and end included."""
+        with self.mutex:
+            self.check()
+            self.store(name, list(self.lookup(name) or [])[start:end + 1 if end != -1 else None])
+            return True
+
+    def lrange(self, name, start, end):
+        """Return the elements of given list between start and end included."""
+        with self.mutex:
+            self.check()
+            return list(self.lookup(name) or [])[start:end + 1 if end != -1 else None]
+
+    def pipeline(self, transaction=True):
+        """Return a pipeline of commands."""
+        return FakePipeline(self)
+
+    def lock(self, name, timeout=None):
+        """Return a lock on given key."""
+        return FakeLock(self, name, timeout)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Trends data backend."""
+
+from abc import ABCMeta, abstractmethod
+
+
+class Backend(ABCMeta('ABC', (object,), {})):
+    """Source of the documents, term statistics and histograms the trends pipeline runs on.
+
+    Ids returned by a backend are opaque to the pipeline, they are only counted and given back to the same backend.
+    Subclasses implementing only part of the methods cannot be instantiated.
+    """
+
+    @abstractmethod
+    def interval_ids(self, start, end):
+        """Retrieve ids of the entries occurring after start (excluded) until end (included)."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def bin_ids(self, start, end):
+        """Retrieve ids of the entries occurring from start (included) until end (excluded)."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def term_statistics(self, ids):
+        """Retrieve the TermStatistics of the terms of given entries."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def date_histograms(self, start, end, granularity, terms, batch_size=None):
+        """Retrieve histograms of entries containing each term (None standing for all entries).
+
+        Histograms are (origin, counts) pairs, origin being the index of the first bin (see binning) and counts those
+        of consecutive bins from there. Entries are counted after start (excluded) until end (included), the bins
+        containing start and end being partial, unless the backend only keeps whole bins: local snapshots count the
+        days after the one containing start up to the one containing end. Histograms are trimmed to their first and
+        last non empty bins. Batch size hints how many terms are fetched together.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Trends backtesting."""
+
+import logging
+
+import numpy as np
+
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.instrumentation import PipelineReport
+from invenio_trends.analysis.local_backend import DAY, day_date, day_index
+from invenio_trends.analysis.term_statistics import TermStatistics
+from invenio_trends.analysis.terms_matrix import TermsMatrix
+
+logger = logging.getLogger(__name__)
+
+
+class Backtest:
+    """Trends of consecutive reference days computed out of a single local snapshot.
+
+    The snapshot counts are transposed once into per term rows. Foreground statistics are then updated by sliding
+    one day at a time and the histograms of each day candidates are sliced out of those rows, so that only the
+    scoring stages of the pipeline run for every day.
+    """
+
+    def __init__(self, detector, snapshot):
+        """Set up a backtest scoring with given detector the counts of given LocalBackend."""
+        self.detector = detector
+        self.snapshot = snapshot
+
+        term_ids = np.asarray(snapshot.term_ids)
+        order = np.argsort(term_ids, kind='mergesort')
+        self.term_indptr = np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(snapshot.terms)))])
+        self.term_days = np.repeat(np.arange(len(snapshot.documents)), np.diff(snapshot.indptr))[order]
+        self.term_doc_freq = np.asarray(snapshot.doc_freq)[order]
+
+    def run(self, start, end, foreground_window, background_window, minimum_frequency_threshold, smoothing_len,
+            num_cluster, num_trends, maximum_candidates=None):
+        """Yield (date, term, score) of the trends of every day from start to end (included).
+
+        The score is the last foreground z-score of the term. Clustering of each day is warm-started from the
+        previous one, as it is by daily updates.
+        """
+        first, last = day_index(start) - self.snapshot.origin, day_index(end) - self.snapshot.origin
+        if first - background_window + 1 < 0 or last >= len(self.snapshot.documents):
+            logger.warning('snapshot only covers %s to %s', day_date(self.snapshot.origin),
+                           day_date(self.snapshot.origin + len(self.snapshot.documents)))
+        doc_freq = np.zeros(len(self.snapshot.terms), dtype=np.int64)
+        term_freq = np.zeros(len(self.snapshot.terms), dtype=np.int64)
+        documents = 0
+
+        for row in range(first - foreground_window + 1, last + 1):
+            documents += self.slide(row, 1, doc_freq, term_freq)
+            if row < first:
+                continue
+            if row > first:
+                documents -= self.slide(row - foreground_window, -1, doc_freq, term_freq)
+
+            reference_date = day_date(self.snapshot.origin + row)
+            self.detector.report = PipelineReport(self.detector.requests)
+            selected = np.flatnonzero(doc_freq >= minimum_frequency_threshold)
+            words = TermStatistics.from_arrays([self.snapshot.terms[i] for i in selected],
+                                               self.snapshot.term_total[selected], self.snapshot.doc_total[selected],
+                                               term_freq[selected], doc_freq[selected], documents)
+            terms = self.detector.sorting_freq_threshold(words, minimum_frequency_threshold, maximum_candidates)
+            hists = self.histogram_matrix(terms, row - background_window + 1, row + 1)
+            trends = self.detector.run_scoring(hists, reference_date - foreground_window * DAY, smoothing_len,
+                                               num_cluster, num_trends)
+            logger.debug('backtested %s: %s', reference_date, [term for term, stats, hist in trends])
+            for term, stats, (dates, scores) in trends:
+                yield reference_date, term, scores[-1]
+
+    def slide(self, row, sign, doc_freq, term_freq):
+        """Add (or subtract) the counts of given snapshot row if any and return its number of documents."""
+        if not 0 <= row < len(self.snapshot.documents):
+            return 0
+        entries = slice(self.snapshot.indptr[row], self.snapshot.indptr[row + 1])
+        ids = self.snapshot.term_ids[entries]
+        doc_freq[ids] += sign * self.snapshot.doc_freq[entries]
+        term_freq[ids] += sign * self.snapshot.term_freq[entries]
+        return int(self.snapshot.documents[row])
+
+    def histogram_matrix(self, terms, lo, hi):
+        """Build the normalized histograms matrix of given terms over snapshot rows in [lo, hi)."""
+        lo, hi = max(lo, 0), min(hi, len(self.snapshot.documents))
+        reference = np.asarray(self.snapshot.documents[lo:hi], dtype=np.float64)
+        nonzero = np.flatnonzero(reference)
+        if not len(terms) or not len(nonzero):
+            return TermsMatrix.empty()
+        reference = reference[nonzero[0]:nonzero[-1] + 1]
+        lo, hi = lo + nonzero[0], lo + nonzero[-1] + 1
+
+        ids = np.array([self.snapshot.ids[term] for term, stats in terms])
+        starts = self.term_indptr[ids]
+        lengths = self.term_indptr[ids + 1] - starts
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = np.repeat(np.arange(len(ids)), lengths)
+        cols = self.term_days[entries] - lo
+        inside = (cols >= 0) & (cols < hi - lo)
+        counts = np.zeros((len(ids), hi - lo))
+        counts[rows[inside], cols[inside]] = self.term_doc_freq[entries][inside]
+
+        return TermsMatrix([term for term, stats in terms], [stats for term, stats in terms], self.snapshot.origin + lo,
+                           Granularity.day, self.detector.normalize_counts(counts, reference))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Calendar-aware binning.
+
+Bins of every granularity are numbered by integers from the epoch: calendar years and months, weeks starting on monday
+as Elasticsearch ones, and fixed length bins below.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from invenio_trends.analysis.granularity import Granularity
+
+EPOCH = datetime(1970, 1, 1)
+# 1970-01-01 is a thursday, weeks are counted from monday 1969-12-29
+WEEK_OFFSET = 3
+
+
+def bin_index(date, granularity):
+    """Return index of the bin containing given date."""
+    if granularity == Granularity.year:
+        return date.year - EPOCH.year
+    if granularity == Granularity.month:
+        return (date.year - EPOCH.year) * 12 + date.month - 1
+    if granularity == Granularity.week:
+        return ((date - EPOCH).days + WEEK_OFFSET) // 7
+    return int((date - EPOCH).total_seconds() // granularity.value.total_seconds())
+
+
+def bin_date(index, granularity):
+    """Return starting date of given bin."""
+    index = int(index)
+    if granularity == Granularity.year:
+        return datetime(EPOCH.year + index, 1, 1)
+    if granularity == Granularity.month:
+        return datetime(EPOCH.year + index // 12, index % 12 + 1, 1)
+    if granularity == Granularity.week:
+        return EPOCH + timedelta(days=index * 7 - WEEK_OFFSET)
+    return EPOCH + index * granularity.value
+
+
+def floor_date(date, granularity):
+    """Return the start of the bin containing given date."""
+    return bin_date(bin_index(date, granularity), granularity)
+
+
+def bin_indices(dates, granularity):
+    """Return indices of the bins containing given dates (datetimes or datetime64)."""
+    dates = np.asarray(dates, dtype='datetime64[ms]')
+    if granularity == Granularity.year:
+        return dates.astype('datetime64[Y]').astype(np.int64)
+    if granularity == Granularity.month:
+        return dates.astype('datetime64[M]').astype(np.int64)
+    if granularity == Granularity.week:
+        return (dates.astype('datetime64[D]').astype(np.int64) + WEEK_OFFSET) // 7
+    return dates.astype(np.int64) // int(granularity.value.total_seconds() * 1000)
+
+
+def bin_starts(indices, granularity):
+    """Return starting dates of given bins as datetime64[ms]."""
+    indices = np.asarray(indices, dtype=np.int64)
+    if granularity == Granularity.year:
+        return indices.astype('datetime64[Y]').astype('datetime64[ms]')
+    if granularity == Granularity.month:
+        return indices.astype('datetime64[M]').astype('datetime64[ms]')
+    if granularity == Granularity.week:
+        return (indices * 7 - WEEK_OFFSET).astype('datetime64[D]').astype('datetime64[ms]')
+    return (indices * int(granularity.value.total_seconds() * 1000)).astype('datetime64[ms]')
+
+
+def bin_dates(indices, granularity):
+    """Return starting dates of given bins as an array of datetimes."""
+    return bin_starts(indices, granularity).astype(object)
+
+
+def rebin(origin, counts, granularity, target):
+    """Sum (origin, counts) bins of granularity, counts being along the last axis, into target granularity bins."""
+    if not counts.shape[-1]:
+        return 0, counts
+    indices = bin_indices(bin_starts(origin + np.arange(counts.shape[-1]), granularity), target)
+    starts = np.flatnonzero(np.concatenate([[True], indices[1:] != indices[:-1]]))
+    return int(indices[0]), np.add.reduceat(counts, starts, axis=-1)
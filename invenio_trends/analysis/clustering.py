@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Clustering of scores."""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ('auto', 'kmeans', 'minibatch')
+FEATURES = ('series', 'summary')
+
+
+def score_features(values, features):
+    """Return the features to cluster: the z-score series or its (slope, peak gradient, last value) summary."""
+    if features == 'series':
+        return values
+    if features == 'summary':
+        bins = np.arange(values.shape[1])
+        slope = np.polyfit(bins, values.T, 1)[0] if len(bins) > 1 else np.zeros(len(values))
+        peak = np.max(np.gradient(values, axis=1), axis=1) if len(bins) > 1 else np.zeros(len(values))
+        return np.column_stack([slope, peak, values[:, -1]])
+    raise ValueError('unknown clustering features: %s' % features)
+
+
+def trending_cluster(centers, features):
+    """Return the index of the cluster whose center grows the most."""
+    if features == 'summary':
+        return np.argmax(centers[:, 1])
+    return np.argmax(np.max(np.gradient(centers, axis=1), axis=1))
+
+
+def fit_predict(features, num_cluster, algorithm, minibatch_threshold, random_state, init=None):
+    """Cluster given features and return labels and centers, warm-starting from init if it fits."""
+    if algorithm not in ALGORITHMS:
+        raise ValueError('unknown clustering algorithm: %s' % algorithm)
+    if algorithm == 'auto':
+        algorithm = 'minibatch' if len(features) > minibatch_threshold else 'kmeans'
+
+    num_cluster = min(num_cluster, len(features))
+    if init is not None and init.shape != (num_cluster, features.shape[1]):
+        logger.info('ignoring previous centers of shape %s, expecting %s', init.shape,
+                    (num_cluster, features.shape[1]))
+        init = None
+    params = {
+        'n_clusters': num_cluster,
+        'random_state': random_state,
+        'init': init if init is not None else 'k-means++',
+    }
+    if init is not None:
+        params['n_init'] = 1
+
+    # imported on first use, sparing web workers which never cluster the import time and memory of scikit-learn
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    logger.debug('clustering %s samples of %s features with %s', len(features), features.shape[1], algorithm)
+    km = MiniBatchKMeans(**params) if algorithm == 'minibatch' else KMeans(**params)
+    labels = km.fit_predict(features)
+    return labels, km.cluster_centers_
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Downsampling of series."""
+
+import numpy as np
+
+
+def lttb(y, threshold, x=None):
+    """Return indices of the points of (x, y) kept by largest-triangle-three-buckets downsampling to threshold points.
+
+    First and last points are always kept. Inner points are split into threshold - 2 buckets, each one keeping the
+    point forming the largest triangle with the point kept in the previous bucket and the average of the next one.
+    """
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    edges = (np.arange(threshold - 1) * ((n - 2) / float(threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # average point of every bucket, the last point standing for the one after the last bucket
+    sizes = np.append(np.diff(edges), 1)
+    next_x = np.add.reduceat(x, edges) / sizes
+    next_y = np.add.reduceat(y, edges) / sizes
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        dx, dy = x[a] - next_x[i + 1], next_y[i + 1] - y[a]
+        areas = np.abs(dx * (y[start:end] - y[a]) - (x[a] - x[start:end]) * dy)
+        a = kept[i + 1] = start + areas.argmax()
+    return kept
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Elasticsearch trends backend."""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from invenio_trends.config import SEARCH_ELASTIC_HOSTS, TRENDS_ELASTICSEARCH_OPTIONS, TRENDS_HISTOGRAM_BATCH_SIZE, \
+    TRENDS_TERM_VECTORS_CHUNK, TRENDS_TERM_VECTORS_CONCURRENCY
+
+from invenio_trends.analysis.backend import Backend
+from invenio_trends.analysis.binning import bin_indices
+from invenio_trends.analysis.instrumentation import RequestCounter
+from invenio_trends.analysis.term_statistics import TermStatistics
+from invenio_trends.connections import ElasticsearchConnections
+from elasticsearch_dsl import Q, Search
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ElasticsearchBackend(Backend):
+    """Backend querying the trends index, ids being document ids and statistics coming from term vectors."""
+
+    def __init__(self, config, client=None, vectors_cache=None, histogram_cache=None, request_counter=None):
+        """Set up a backend on the trends index, optionally reading term vectors and histograms through caches.
+
+        A client can be given together with the request counter its connections report to.
+        """
+        self.vectors_cache = vectors_cache
+        self.histogram_cache = histogram_cache
+        if client is None:
+            connections = ElasticsearchConnections(SEARCH_ELASTIC_HOSTS, **TRENDS_ELASTICSEARCH_OPTIONS)
+            client, request_counter = connections.client, connections.requests
+        self.requests = request_counter or RequestCounter()
+        self.client = client
+        self.index = config['index']
+        self.date_field = config['date_field']
+        self.analysis_field = config['analysis_field']
+        self.doc_type = config['doc_type']
+
+    def interval_ids(self, start, end):
+        """Retrieve list of ids occurring between start and end."""
+        logger.debug('retrieving ids from %s to %s', start, end)
+        q = Search(using=self.client, index=self.index) \
+            .fields(['']) \
+            .filter('exists', field=self.analysis_field) \
+            .filter('range', **{self.date_field: {'gt': start, 'lte': end}})
+        return [elem.meta.id for elem in q.scan()]
+
+    def bin_ids(self, start, end):
+        """Retrieve list of ids of the bin starting at start (included) until end (excluded)."""
+        q = Search(using=self.client, index=self.index) \
+            .fields(['']) \
+            .filter('exists', field=self.analysis_field) \
+            .filter('range', **{self.date_field: {'gte': start, 'lt': end}})
+        return [elem.meta.id for elem in q.scan()]
+
+    def term_statistics(self, ids, chunk=TRENDS_TERM_VECTORS_CHUNK, concurrency=TRENDS_TERM_VECTORS_CONCURRENCY):
+        """Retrieve all terms together with their stats, folding chunks of term vectors while others are in flight.
+
+        Cached term vectors are folded last, chunk by chunk, so that the estimates fetched by this run take
+        precedence over the ones of their first fetch.
+        """
+        words = TermStatistics()
+        if not len(ids):
+            return words
+        if self.vectors_cache is not None:
+            cached = self.vectors_cache.cached_ids(ids)
+            logger.debug('found %s cached term vectors out of %s ids', len(cached), len(ids))
+            ids_missing = [id for id in ids if id not in cached]
+        else:
+            ids_missing = ids
+
+        logger.debug('retrieving term vectors for %s ids by chunks of %s, %s in flight', len(ids_missing), chunk,
+                     concurrency)
+        chunks = iter(range(0, len(ids_missing), chunk))
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = deque(executor.submit(self.fetch_term_vectors, ids_missing[pos:pos + chunk])
+                            for pos in islice(chunks, concurrency))
+            while pending:
+                # fold in request order so that terms are always numbered the same way
+                vectors = pending.popleft().result()
+                for id, vector in vectors:
+                    words.add(vector)
+                if self.vectors_cache is not None:
+                    self.vectors_cache.put_many(vectors)
+                pending.extend(executor.submit(self.fetch_term_vectors, ids_missing[pos:pos + chunk])
+                               for pos in islice(chunks, 1))
+        if self.vectors_cache is not None:
+            for id, vector in self.vectors_cache.get_many([id for id in ids if id in cached]):
+                words.add(vector)
+
+        assert len(ids) == words.documents
+        return words
+
+    def fetch_term_vectors(self, ids):
+        """Retrieve the (id, term vector) pairs of given documents in a single request."""
+        q = self.client.mtermvectors(
+            index=self.index,
+            doc_type=self.doc_type,
+            ids=ids,
+            fields=[self.analysis_field],
+            field_statistics=False,
+            term_statistics=True,
+            offsets=False,
+            payloads=False,
+            positions=False,
+            realtime=True
+        )
+        return [(doc['_id'], doc['term_vectors'][self.analysis_field]['terms']) for doc in q['docs']
+                if self.analysis_field in doc['term_vectors']]
+
+    def date_histograms(self, start, end, granularity, terms, batch_size=TRENDS_HISTOGRAM_BATCH_SIZE):
+        """Retrieve the date histograms of many terms at once (None standing for all entries).
+
+        Histograms are first looked up in the cache if any. Missing terms are packed by batches into a filters
+        aggregation, one bucket per term, sharing the same date histogram sub-aggregation, hence a single round trip
+        per batch.
+        """
+        hists = [None] * len(terms)
+        keys = None
+        if self.histogram_cache is not None:
+            keys = self.histogram_cache.keys(self.index, terms, start, end, granularity)
+        if keys is not None:
+            hists = self.histogram_cache.get_many(keys)
+        missing = [i for i, hist in enumerate(hists) if hist is None]
+        logger.debug('retrieving %s histograms out of %s', len(missing), len(terms))
+
+        for pos in range(0, len(missing), batch_size):
+            batch = missing[pos:pos + batch_size]
+            filters = dict((str(i), self.term_query(terms[i])) for i in batch)
+            q = Search(using=self.client, index=self.index)[0:0] \
+                .filter('range', **{self.date_field: {'gt': start, 'lte': end}})
+            q.aggs.bucket('terms', 'filters', filters=filters).bucket(
+                'hist',
+                'date_histogram',
+                field=self.date_field,
+                interval=granularity.name
+            )
+            buckets = q.execute().aggregations.terms.buckets
+            fetched = [self.parse_histogram(buckets[str(i)].hist.buckets, granularity) for i in batch]
+            for i, hist in zip(batch, fetched):
+                hists[i] = hist
+            if keys is not None:
+                self.histogram_cache.set_many([keys[i] for i in batch], fetched)
+        return hists
+
+    def term_query(self, term):
+        """Return query matching entries containing given term or all entries if None."""
+        if term is None:
+            return Q('match_all')
+        return Q('match_phrase', **{self.analysis_field: term})
+
+    def parse_histogram(self, buckets, granularity):
+        """Convert date histogram buckets into the index of the first bin and the counts of consecutive bins."""
+        if not len(buckets):
+            return 0, np.zeros(0, dtype=np.int64)
+
+        keys = np.fromiter((elem.key for elem in buckets), dtype=np.int64, count=len(buckets))
+        indices = bin_indices(keys.astype('datetime64[ms]'), granularity)
+        counts = np.zeros(indices[-1] - indices[0] + 1, dtype=np.int64)
+        counts[indices - indices[0]] = np.fromiter((elem.doc_count for elem in buckets), dtype=np.int64,
+                                                   count=len(buckets))
+        return int(indices[0]), counts
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Histogram cache."""
+
+import hashlib
+import json
+import logging
+
+import numpy as np
+from redis import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class HistogramCache:
+    """Redis cache of date histograms stored as packed int64 arrays of first bin index and counts.
+
+    Keys embed a generation number which is bumped whenever the index is updated, invalidating all entries at once
+    while the TTL collects the stale ones, and the encoding version. Redis being unavailable is logged and every
+    histogram reported missing.
+    """
+
+    version = 2
+
+    def __init__(self, redis, prefix, ttl):
+        """Set up a cache storing entries under given key prefix for ttl seconds."""
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def invalidate(self):
+        """Invalidate all cached histograms."""
+        generation = self.redis.incr(self.prefix + ':generation')
+        logger.info('histogram cache invalidated, generation %s', generation)
+
+    def keys(self, index, terms, start, end, granularity):
+        """Return cache keys of given histograms for the current generation or None if redis is unavailable."""
+        try:
+            generation = int(self.redis.get(self.prefix + ':generation') or 0)
+        except RedisError:
+            logger.warning('histogram cache unavailable', exc_info=True)
+            return None
+        bounds = [date.isoformat() if date is not None else None for date in (start, end)]
+        return [
+            '%s:%s:%s' % (self.prefix, generation, hashlib.sha1(json.dumps(
+                [self.version, index, term] + bounds + [granularity.name]
+            ).encode('utf-8')).hexdigest())
+            for term in terms
+        ]
+
+    def get_many(self, keys):
+        """Return cached histograms for given keys, None when missing."""
+        try:
+            cached = self.redis.mget(keys)
+        except RedisError:
+            logger.warning('histogram cache unavailable', exc_info=True)
+            return [None] * len(keys)
+        return [self.decode(data) if data is not None else None for data in cached]
+
+    def set_many(self, keys, hists):
+        """Cache histograms under given keys."""
+        pipeline = self.redis.pipeline(transaction=False)
+        for key, hist in zip(keys, hists):
+            pipeline.setex(key, self.ttl, self.encode(hist))
+        try:
+            pipeline.execute()
+        except RedisError:
+            logger.warning('histogram cache unavailable', exc_info=True)
+
+    def encode(self, hist):
+        """Pack origin and counts into little endian int64 bytes."""
+        origin, y = hist
+        return np.concatenate([[origin], np.asarray(y, dtype=np.int64)]).astype('<i8').tobytes()
+
+    def decode(self, data):
+        """Unpack bytes into origin and counts array."""
+        packed = np.frombuffer(data, dtype='<i8')
+        return int(packed[0]), packed[1:].astype(np.int64)
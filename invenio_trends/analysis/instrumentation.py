@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Pipeline instrumentation."""
+
+import logging
+import threading
+from datetime import datetime
+from timeit import default_timer
+
+from elasticsearch import Urllib3HttpConnection
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCounter:
+    """Thread safe counter of requests and response bytes."""
+
+    def __init__(self):
+        """Start counting from zero."""
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+
+    def add(self, size):
+        """Count a request with given response size."""
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+
+    def snapshot(self):
+        """Return current (requests, bytes) counts."""
+        with self.lock:
+            return self.requests, self.bytes
+
+
+class CountingConnection(Urllib3HttpConnection):
+    """Elasticsearch connection reporting every response to a request counter."""
+
+    def __init__(self, counter=None, **kwargs):
+        """Set up connection with given counter."""
+        super(CountingConnection, self).__init__(**kwargs)
+        self.counter = counter
+
+    def perform_request(self, *args, **kwargs):
+        """Perform request and count it."""
+        status, headers, data = super(CountingConnection, self).perform_request(*args, **kwargs)
+        if self.counter is not None:
+            self.counter.add(len(data) if data else 0)
+        return status, headers, data
+
+
+class PipelineReport:
+    """Per stage wall time, requests, response bytes and items counts of a pipeline run."""
+
+    def __init__(self, counter):
+        """Start a new report counting requests with given counter."""
+        self.counter = counter
+        self.started = datetime.now()
+        self.stages = []
+
+    def measure(self, name, items_in, func, *args, **kwargs):
+        """Run a stage and record its statistics, items out being the length of its result."""
+        requests, size = self.counter.snapshot()
+        start = default_timer()
+        res = func(*args, **kwargs)
+        elapsed = default_timer() - start
+        requests_after, size_after = self.counter.snapshot()
+        stage = {
+            'stage': name,
+            'time': elapsed,
+            'requests': requests_after - requests,
+            'bytes': size_after - size,
+            'items_in': items_in,
+            'items_out': len(res),
+        }
+        logger.debug('stage %(stage)s took %(time).3fs, %(requests)s requests, %(bytes)s bytes, '
+                     '%(items_in)s items in, %(items_out)s items out', stage)
+        self.stages.append(stage)
+        return res
+
+    def to_dict(self):
+        """Return report as a json serializable dict."""
+        return {
+            'started': self.started.isoformat(),
+            'time': sum(stage['time'] for stage in self.stages),
+            'requests': sum(stage['requests'] for stage in self.stages),
+            'bytes': sum(stage['bytes'] for stage in self.stages),
+            'stages': self.stages,
+        }
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Local snapshot trends backend."""
+
+import io
+import json
+import logging
+import os
+
+import numpy as np
+
+from invenio_trends.analysis.backend import Backend
+from invenio_trends.analysis.binning import bin_date, bin_index
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.instrumentation import RequestCounter
+from invenio_trends.analysis.term_statistics import TermStatistics
+
+logger = logging.getLogger(__name__)
+
+DAY = Granularity.day.value
+
+
+def day_index(date):
+    """Return index of the day containing given date."""
+    return bin_index(date, Granularity.day)
+
+
+def day_date(index):
+    """Return starting date of given day."""
+    return bin_date(index, Granularity.day)
+
+
+class LocalBackend(Backend):
+    """Backend reading a snapshot of per day term document counts, ids being day indices.
+
+    The snapshot directory holds the vocabulary, per term estimates, the number of documents of each day and the
+    days x terms counts as compressed sparse rows, all arrays being memory-mapped.
+    """
+
+    def __init__(self, path):
+        """Open the snapshot stored in given directory."""
+        self.path = path
+        self.requests = RequestCounter()
+        with open(self.file('meta.json')) as f:
+            meta = json.load(f)
+        self.origin = meta['origin']
+        with io.open(self.file('vocabulary.txt'), encoding='utf-8') as f:
+            self.terms = f.read().splitlines()
+        self.ids = dict((term, i) for i, term in enumerate(self.terms))
+        self.term_total = self.load('term_total')
+        self.doc_total = self.load('doc_total')
+        self.documents = self.load('documents')
+        self.indptr = self.load('indptr')
+        self.term_ids = self.load('terms')
+        self.doc_freq = self.load('doc_freq')
+        self.term_freq = self.load('term_freq')
+        logger.debug('opened snapshot %s of %s days and %s terms', path, len(self.documents), len(self.terms))
+
+    def file(self, name):
+        """Return path of given file inside the snapshot."""
+        return os.path.join(self.path, name)
+
+    def load(self, name):
+        """Memory-map given array of the snapshot."""
+        return np.load(self.file(name + '.npy'), mmap_mode='r')
+
+    def days(self, first, last):
+        """Return the days between first and last indices (excluded) clipped to the snapshot ones."""
+        return range(max(first, self.origin), min(last, self.origin + len(self.documents)))
+
+    def interval_ids(self, start, end):
+        """Retrieve the days after start (excluded) until end (included)."""
+        return list(self.days(day_index(start) + 1, day_index(end) + 1))
+
+    def bin_ids(self, start, end):
+        """Retrieve the days from start (included) until end (excluded)."""
+        first, last = day_index(start), day_index(end)
+        return list(self.days(first + (day_date(first) < start), last + (day_date(last) < end)))
+
+    def term_statistics(self, ids):
+        """Sum the term statistics of given days."""
+        rows = np.asarray(ids, dtype=np.int64) - self.origin
+        if not len(rows):
+            return TermStatistics()
+        entries = [slice(self.indptr[row], self.indptr[row + 1]) for row in rows]
+        terms = np.concatenate([self.term_ids[entry] for entry in entries])
+        doc_freq = np.bincount(terms, np.concatenate([self.doc_freq[entry] for entry in entries]),
+                               minlength=len(self.terms)).astype(np.int64)
+        term_freq = np.bincount(terms, np.concatenate([self.term_freq[entry] for entry in entries]),
+                                minlength=len(self.terms)).astype(np.int64)
+
+        seen = np.flatnonzero(doc_freq)
+        return TermStatistics.from_arrays([self.terms[i] for i in seen], self.term_total[seen], self.doc_total[seen],
+                                          term_freq[seen], doc_freq[seen], int(self.documents[rows].sum()))
+
+    def date_histograms(self, start, end, granularity, terms, batch_size=None):
+        """Slice the day histograms of given terms (None standing for all entries) out of the sparse rows at once."""
+        if granularity != Granularity.day:
+            raise ValueError('local snapshots only have day bins, got %s' % granularity.name)
+        first = self.origin if start is None else day_index(start) + 1
+        last = self.origin + len(self.documents) if end is None else day_index(end) + 1
+        days = self.days(first, last)
+        if not len(days):
+            return [(0, np.zeros(0, dtype=np.int64)) for term in terms]
+        lo, hi = days[0] - self.origin, days[-1] + 1 - self.origin
+
+        known = sorted(set(self.ids[term] for term in terms if term in self.ids))
+        rows = np.full(len(self.terms), -1, dtype=np.int64)
+        rows[known] = np.arange(len(known))
+        entries = slice(self.indptr[lo], self.indptr[hi])
+        selected = rows[self.term_ids[entries]]
+        found = selected >= 0
+        cols = np.repeat(np.arange(hi - lo), np.diff(self.indptr[lo:hi + 1]))
+        counts = np.zeros((len(known), hi - lo), dtype=np.int64)
+        counts[selected[found], cols[found]] = self.doc_freq[entries][found]
+
+        hists = []
+        for term in terms:
+            if term is None:
+                y = np.asarray(self.documents[lo:hi], dtype=np.int64)
+            elif term in self.ids:
+                y = counts[rows[self.ids[term]]]
+            else:
+                y = np.zeros(0, dtype=np.int64)
+            nonzero = np.flatnonzero(y)
+            if not len(nonzero):
+                hists.append((0, y[:0]))
+            else:
+                hists.append((days[nonzero[0]], y[nonzero[0]:nonzero[-1] + 1]))
+        return hists
+
+    @staticmethod
+    def export(path, source, start, end):
+        """Write a snapshot of the days from start until end (excluded) fetched from another backend and open it."""
+        first, last = day_index(start), day_index(end)
+        logger.info('exporting days %s to %s into snapshot %s', first, last, path)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        ids = {}
+        term_total, doc_total, documents, indptr = [], [], [], [0]
+        term_ids, doc_freq, term_freq = [], [], []
+        for index in range(first, last):
+            words = source.term_statistics(source.bin_ids(day_date(index), day_date(index + 1)))
+            interned = np.empty(len(words), dtype=np.int64)
+            for i, (term, stats) in enumerate(words.items()):
+                interned[i] = ids.setdefault(term, len(ids))
+                if interned[i] == len(term_total):
+                    term_total.append(0)
+                    doc_total.append(0)
+                term_total[interned[i]] = stats['term_total']
+                doc_total[interned[i]] = stats['doc_total']
+            order = np.argsort(interned)
+            term_ids.append(interned[order].astype(np.int32))
+            doc_freq.append(np.asarray(words.doc_freq, dtype=np.int32)[order])
+            term_freq.append(np.asarray(words.term_freq, dtype=np.int32)[order])
+            documents.append(words.documents)
+            indptr.append(indptr[-1] + len(words))
+
+        arrays = {
+            'term_total': np.array(term_total, dtype=np.int64),
+            'doc_total': np.array(doc_total, dtype=np.int64),
+            'documents': np.array(documents, dtype=np.int64),
+            'indptr': np.array(indptr, dtype=np.int64),
+            'terms': np.concatenate(term_ids or [np.zeros(0, dtype=np.int32)]),
+            'doc_freq': np.concatenate(doc_freq or [np.zeros(0, dtype=np.int32)]),
+            'term_freq': np.concatenate(term_freq or [np.zeros(0, dtype=np.int32)]),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + '.npy'), array)
+        with io.open(os.path.join(path, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+            for term in sorted(ids, key=ids.get):
+                f.write(term + u'\n')
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'origin': first}, f)
+        return LocalBackend(path)
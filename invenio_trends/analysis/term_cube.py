@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Term count cube."""
+
+import io
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+from invenio_trends.analysis.binning import bin_date, bin_index
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.term_statistics import TermStatistics
+
+logger = logging.getLogger(__name__)
+
+
+class TermCube:
+    """Persistent term x time bin document counts, stored as one sparse file per bin.
+
+    Each bin file holds the ids of the terms occurring in the bin together with their document and term
+    frequencies and the total number of documents of the bin. Terms are interned into an append-only vocabulary,
+    compacted once enough of its terms no longer occur in any stored bin. Bins, vocabulary and estimates live in a
+    generation directory, compaction writing the next one and switching to it with a single rename.
+    """
+
+    def __init__(self, path, granularity):
+        """Open (or create) the cube stored in given directory."""
+        if granularity.value > Granularity.day.value:
+            raise ValueError('cube bins must have a fixed length, got %s' % granularity.name)
+        self.path = path
+        self.granularity = granularity
+        self.generation = 0
+        if os.path.exists(os.path.join(path, 'generation')):
+            with open(os.path.join(path, 'generation')) as f:
+                self.generation = int(f.read())
+        self.remove_generations()
+        self.bins_path = os.path.join(self.generation_path(self.generation), 'bins')
+        if not os.path.isdir(self.bins_path):
+            os.makedirs(self.bins_path)
+
+        self.meta = {'granularity': granularity.name, 'watermark': None}
+        if os.path.exists(self.file('meta.json')):
+            with open(self.file('meta.json')) as f:
+                self.meta = json.load(f)
+        if self.meta['granularity'] != granularity.name:
+            raise ValueError('cube %s has granularity %s' % (path, self.meta['granularity']))
+
+        self.terms = []
+        if os.path.exists(self.file('vocabulary.txt')):
+            with io.open(self.file('vocabulary.txt'), encoding='utf-8') as f:
+                self.terms = f.read().splitlines()
+        self.saved_terms = len(self.terms)
+        self.ids = dict((term, i) for i, term in enumerate(self.terms))
+
+        self.term_total = np.zeros(len(self.terms), dtype=np.int64)
+        self.doc_total = np.zeros(len(self.terms), dtype=np.int64)
+        if os.path.exists(self.file('estimates.npz')):
+            estimates = np.load(self.file('estimates.npz'))
+            self.term_total[:len(estimates['term_total'])] = estimates['term_total']
+            self.doc_total[:len(estimates['doc_total'])] = estimates['doc_total']
+
+    def generation_path(self, generation):
+        """Return path of the directory of given generation."""
+        return os.path.join(self.path, 'generations', str(generation))
+
+    def remove_generations(self):
+        """Remove all generations but the current one, such as the leftovers of an interrupted compaction."""
+        generations = os.path.join(self.path, 'generations')
+        if not os.path.isdir(generations):
+            return
+        for name in os.listdir(generations):
+            if name != str(self.generation):
+                shutil.rmtree(os.path.join(generations, name))
+
+    def file(self, name):
+        """Return path of given file inside the current generation of the cube."""
+        return os.path.join(self.generation_path(self.generation), name)
+
+    def bin_file(self, index):
+        """Return path of given bin file."""
+        return os.path.join(self.bins_path, '%d.npz' % index)
+
+    def bin_index(self, date):
+        """Return index of the bin containing given date."""
+        return bin_index(date, self.granularity)
+
+    def bin_date(self, index):
+        """Return starting date of given bin."""
+        return bin_date(index, self.granularity)
+
+    @property
+    def watermark(self):
+        """Return index of the last bin entirely fetched or None if the cube is empty."""
+        return self.meta['watermark']
+
+    def bins(self):
+        """Return sorted indices of stored bins."""
+        return sorted(int(name[:-len('.npz')]) for name in os.listdir(self.bins_path) if name.endswith('.npz'))
+
+    def intern(self, words):
+        """Map terms of given statistics to cube ids, growing vocabulary and refreshing estimates."""
+        ids = np.empty(len(words), dtype=np.int64)
+        for i, term in enumerate(words.terms):
+            ids[i] = self.ids.setdefault(term, len(self.terms))
+            if ids[i] == len(self.terms):
+                self.terms.append(term)
+        if len(self.terms) > len(self.term_total):
+            grow = len(self.terms) - len(self.term_total)
+            self.term_total = np.append(self.term_total, np.zeros(grow, dtype=np.int64))
+            self.doc_total = np.append(self.doc_total, np.zeros(grow, dtype=np.int64))
+        self.term_total[ids] = words.term_total
+        self.doc_total[ids] = words.doc_total
+        return ids
+
+    def add_bin(self, index, words):
+        """Store (or replace) the statistics of given bin."""
+        ids = self.intern(words)
+        order = np.argsort(ids)
+        self.write_bin(index, {
+            'terms': ids[order].astype(np.int32),
+            'doc_freq': np.asarray(words.doc_freq, dtype=np.int32)[order],
+            'term_freq': np.asarray(words.term_freq, dtype=np.int32)[order],
+            'documents': np.array([words.documents], dtype=np.int64),
+        })
+
+    def write_bin(self, index, arrays, bins_path=None):
+        """Atomically write the arrays of given bin, into given bins directory if not the current one."""
+        path = os.path.join(bins_path or self.bins_path, '%d.npz' % index)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **arrays)
+        os.rename(path + '.tmp', path)
+
+    def load_bin(self, index):
+        """Load given bin or None if it has never been fetched."""
+        if not os.path.exists(self.bin_file(index)):
+            return None
+        with np.load(self.bin_file(index)) as counts:
+            return dict(counts)
+
+    def evict(self, before, slack=0.25):
+        """Remove bins older than given index, then compact the vocabulary (see compact)."""
+        evicted = [index for index in self.bins() if index < before]
+        for index in evicted:
+            os.remove(self.bin_file(index))
+        if evicted:
+            self.compact(slack)
+
+    def compact(self, slack=0.25):
+        """Drop the terms occurring in no stored bin if they make up more than a fraction slack of the vocabulary.
+
+        Stored bins are renumbered and written along with vocabulary, estimates and meta into the next generation,
+        which then replaces the current one at once: an interrupted compaction leaves the cube untouched. Return
+        whether the cube was compacted.
+        """
+        used = np.zeros(len(self.terms), dtype=bool)
+        for index in self.bins():
+            used[self.load_bin(index)['terms']] = True
+        kept = np.flatnonzero(used)
+        if len(self.terms) - len(kept) <= slack * len(self.terms):
+            return False
+        logger.info('compacting cube vocabulary from %s to %s terms', len(self.terms), len(kept))
+
+        # ids are renumbered in the same order, bins stay sorted by term id
+        renumbered = np.full(len(self.terms), -1, dtype=np.int64)
+        renumbered[kept] = np.arange(len(kept))
+        previous, generation = self.generation, self.generation + 1
+        bins_path = os.path.join(self.generation_path(generation), 'bins')
+        shutil.rmtree(self.generation_path(generation), ignore_errors=True)
+        os.makedirs(bins_path)
+        for index in self.bins():
+            counts = self.load_bin(index)
+            counts['terms'] = renumbered[counts['terms']].astype(np.int32)
+            self.write_bin(index, counts, bins_path)
+
+        self.generation, self.bins_path = generation, bins_path
+        self.terms = [self.terms[i] for i in kept]
+        self.ids = dict((term, i) for i, term in enumerate(self.terms))
+        self.term_total = self.term_total[kept]
+        self.doc_total = self.doc_total[kept]
+        self.saved_terms = 0
+        self.save_vocabulary()
+        self.save_meta()
+        with open(os.path.join(self.path, 'generation.tmp'), 'w') as f:
+            f.write(str(generation))
+        os.rename(os.path.join(self.path, 'generation.tmp'), os.path.join(self.path, 'generation'))
+        shutil.rmtree(self.generation_path(previous))
+        return True
+
+    def save_vocabulary(self):
+        """Persist new terms of the vocabulary, rewriting it entirely after a compaction, and the estimates."""
+        if self.saved_terms:
+            with io.open(self.file('vocabulary.txt'), 'a', encoding='utf-8') as f:
+                for term in self.terms[self.saved_terms:]:
+                    f.write(term + u'\n')
+        else:
+            tmp = self.file('vocabulary.txt.tmp')
+            with io.open(tmp, 'w', encoding='utf-8') as f:
+                for term in self.terms:
+                    f.write(term + u'\n')
+            os.rename(tmp, self.file('vocabulary.txt'))
+        self.saved_terms = len(self.terms)
+        with open(self.file('estimates.npz'), 'wb') as f:
+            np.savez(f, term_total=self.term_total, doc_total=self.doc_total)
+
+    def save_meta(self):
+        """Persist granularity and watermark."""
+        with open(self.file('meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+    def save(self, watermark):
+        """Persist vocabulary, estimates and watermark."""
+        self.save_vocabulary()
+        self.meta['watermark'] = watermark
+        self.save_meta()
+
+    def statistics(self, start, end):
+        """Sum term statistics of bins in [start, end) as if fetched from term vectors."""
+        doc_freq = np.zeros(len(self.terms), dtype=np.int64)
+        term_freq = np.zeros(len(self.terms), dtype=np.int64)
+        documents = 0
+        for index in range(start, end):
+            counts = self.load_bin(index)
+            if counts is None:
+                continue
+            doc_freq += np.bincount(counts['terms'], counts['doc_freq'], minlength=len(self.terms)).astype(np.int64)
+            term_freq += np.bincount(counts['terms'], counts['term_freq'], minlength=len(self.terms)).astype(np.int64)
+            documents += int(counts['documents'][0])
+
+        seen = np.flatnonzero(doc_freq)
+        return TermStatistics.from_arrays([self.terms[i] for i in seen], self.term_total[seen], self.doc_total[seen],
+                                          term_freq[seen], doc_freq[seen], documents)
+
+    def histograms(self, terms, start, end):
+        """Return reference counts and terms x bins document counts for bins in [start, end)."""
+        rows = np.full(len(self.terms), -1, dtype=np.int64)
+        rows[[self.ids[term] for term in terms]] = np.arange(len(terms))
+        counts = np.zeros((len(terms), end - start))
+        reference = np.zeros(end - start)
+        for col, index in enumerate(range(start, end)):
+            hist = self.load_bin(index)
+            if hist is None:
+                continue
+            reference[col] = hist['documents'][0]
+            selected = rows[hist['terms']]
+            found = selected >= 0
+            counts[selected[found], col] = hist['doc_freq'][found]
+        return reference, counts
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Term statistics."""
+
+from array import array
+
+
+class TermStatistics:
+    """Compact accumulator of term statistics, interning terms into integer ids indexing parallel arrays."""
+
+    def __init__(self):
+        """Set up an empty accumulator."""
+        self.documents = 0
+        self.ids = {}
+        self.terms = []
+        self.term_total = array('l')
+        self.doc_total = array('l')
+        self.term_freq = array('l')
+        self.doc_freq = array('l')
+
+    def add(self, vector):
+        """Fold a single document term vector into the statistics."""
+        self.documents += 1
+        for word, freqs in vector.items():
+            i = self.ids.get(word)
+            if i is None:
+                self.ids[word] = len(self.terms)
+                self.terms.append(word)
+                self.term_total.append(freqs['ttf'])  # estimate
+                self.doc_total.append(freqs['doc_freq'])  # estimate
+                self.term_freq.append(freqs['term_freq'])
+                self.doc_freq.append(1)
+            else:
+                self.term_freq[i] += freqs['term_freq']
+                self.doc_freq[i] += 1
+
+    def update(self, words):
+        """Fold other statistics, over distinct documents, into these ones."""
+        self.documents += words.documents
+        for j, term in enumerate(words.terms):
+            i = self.ids.get(term)
+            if i is None:
+                self.ids[term] = len(self.terms)
+                self.terms.append(term)
+                self.term_total.append(words.term_total[j])
+                self.doc_total.append(words.doc_total[j])
+                self.term_freq.append(words.term_freq[j])
+                self.doc_freq.append(words.doc_freq[j])
+            else:
+                self.term_freq[i] += words.term_freq[j]
+                self.doc_freq[i] += words.doc_freq[j]
+
+    @staticmethod
+    def from_arrays(terms, term_total, doc_total, term_freq, doc_freq, documents):
+        """Build statistics from already merged parallel sequences."""
+        words = TermStatistics()
+        words.documents = documents
+        words.terms = list(terms)
+        words.ids = dict((term, i) for i, term in enumerate(words.terms))
+        words.term_total.extend(int(e) for e in term_total)
+        words.doc_total.extend(int(e) for e in doc_total)
+        words.term_freq.extend(int(e) for e in term_freq)
+        words.doc_freq.extend(int(e) for e in doc_freq)
+        return words
+
+    def stats(self, i):
+        """Return the statistics of the term with given id."""
+        return {
+            'term_total': self.term_total[i],
+            'doc_total': self.doc_total[i],
+            'term_freq': self.term_freq[i],
+            'doc_freq': self.doc_freq[i],
+        }
+
+    def items(self):
+        """Iterate over (term, stats) pairs."""
+        for i, term in enumerate(self.terms):
+            yield term, self.stats(i)
+
+    def __getitem__(self, term):
+        """Return the statistics of given term."""
+        return self.stats(self.ids[term])
+
+    def __contains__(self, term):
+        """Check whether given term has been seen."""
+        return term in self.ids
+
+    def __len__(self):
+        """Return number of distinct terms."""
+        return len(self.terms)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Term vectors cache."""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class TermVectorsCache:
+    """Local read-through cache of per-document term vectors stored in SQLite.
+
+    Entries are tagged with a hash of the analyzer configuration and dropped as soon as it changes. The ttf and
+    doc_freq estimates are the ones of the first fetch, hence cached vectors should be folded after fetched ones.
+    """
+
+    def __init__(self, path, analyzer_config, chunk=500):
+        """Open (or create) the cache database and drop entries of other analyzer configurations."""
+        self.connection = sqlite3.connect(path)
+        self.chunk = chunk  # stays below sqlite maximum number of bound variables
+        self.config = hashlib.sha1(json.dumps(analyzer_config, sort_keys=True).encode('utf-8')).hexdigest()
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS vectors '
+                                    '(id TEXT PRIMARY KEY, config TEXT, seen REAL, vector BLOB)')
+            deleted = self.connection.execute('DELETE FROM vectors WHERE config != ?', (self.config,)).rowcount
+        if deleted > 0:
+            logger.info('analyzer changed, evicted %s cached term vectors', deleted)
+
+    def cached_ids(self, ids):
+        """Return the set of given ids having a cached term vector."""
+        found = set()
+        for pos in range(0, len(ids), self.chunk):
+            chunk = ids[pos:pos + self.chunk]
+            marks = ','.join('?' * len(chunk))
+            found.update(id for id, in self.connection.execute('SELECT id FROM vectors WHERE id IN (%s)' % marks,
+                                                               chunk))
+        return found
+
+    def get_many(self, ids):
+        """Iterate over the (id, term vector) pairs cached among given ids, chunk by chunk, marking them as seen."""
+        now = time.time()
+        for pos in range(0, len(ids), self.chunk):
+            chunk = ids[pos:pos + self.chunk]
+            marks = ','.join('?' * len(chunk))
+            with self.connection:
+                rows = self.connection.execute('SELECT id, vector FROM vectors WHERE id IN (%s)' % marks,
+                                               chunk).fetchall()
+                self.connection.execute('UPDATE vectors SET seen = ? WHERE id IN (%s)' % marks, [now] + chunk)
+            for id, vector in rows:
+                yield id, self.decode(vector)
+
+    def put_many(self, vectors):
+        """Store given (id, term vector) pairs."""
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)',
+                                        ((id, self.config, now, self.encode(vector)) for id, vector in vectors))
+
+    def evict(self, max_age):
+        """Remove entries not seen for more than given number of seconds."""
+        with self.connection:
+            deleted = self.connection.execute('DELETE FROM vectors WHERE seen < ?', (time.time() - max_age,)).rowcount
+        logger.debug('evicted %s cached term vectors', deleted)
+
+    def encode(self, vector):
+        """Serialize a term vector keeping only the statistics used by the pipeline."""
+        compact = dict((term, [freqs['term_freq'], freqs['ttf'], freqs['doc_freq']]) for term, freqs in vector.items())
+        return sqlite3.Binary(zlib.compress(json.dumps(compact).encode('utf-8')))
+
+    def decode(self, data):
+        """Deserialize a term vector."""
+        compact = json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+        return dict((term, {'term_freq': tf, 'ttf': ttf, 'doc_freq': df}) for term, (tf, ttf, df) in compact.items())
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Terms matrix."""
+
+import numpy as np
+
+from invenio_trends.analysis.binning import bin_starts
+
+
+class TermsMatrix:
+    """Dense terms x bins matrix of histogram values sharing the same consecutive bins from origin."""
+
+    def __init__(self, terms, stats, origin, granularity, values):
+        """Wrap terms with their stats and one row of values per term."""
+        assert len(terms) == len(stats) == values.shape[0]
+        self.terms = terms
+        self.stats = stats
+        self.origin = origin
+        self.granularity = granularity
+        self.values = values
+
+    def __len__(self):
+        """Return number of terms."""
+        return len(self.terms)
+
+    @property
+    def dates(self):
+        """Return starting dates of the bins as datetime64[ms]."""
+        if not self.values.shape[1]:
+            return np.array([], dtype='datetime64[ms]')
+        return bin_starts(self.origin + np.arange(self.values.shape[1]), self.granularity)
+
+    def select(self, rows):
+        """Return a new matrix restricted to given rows (indices or boolean mask)."""
+        rows = np.arange(len(self))[rows]
+        return TermsMatrix([self.terms[i] for i in rows], [self.stats[i] for i in rows], self.origin,
+                           self.granularity, self.values[rows])
+
+    def to_list(self):
+        """Convert back into a list of (term, stats, (dates, values)) tuples."""
+        dates = self.dates
+        return [(term, stats, (dates, values)) for term, stats, values in zip(self.terms, self.stats, self.values)]
+
+    @staticmethod
+    def empty():
+        """Return a matrix without any term nor bin."""
+        return TermsMatrix([], [], 0, None, np.zeros((0, 0)))
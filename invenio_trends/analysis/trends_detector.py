@@ -26,14 +26,19 @@
 
 from __future__ import division
 
+import heapq
 import logging
+from operator import itemgetter
 
-from elasticsearch import Elasticsearch
-from invenio_trends.config import SEARCH_ELASTIC_HOSTS
-from sklearn.cluster import KMeans
+from invenio_trends.config import TRENDS_CLUSTERING, TRENDS_CLUSTERING_FEATURES, TRENDS_CLUSTERING_MINIBATCH, \
+    TRENDS_CLUSTERING_SEED, TRENDS_CUBE_REFRESH, TRENDS_HISTOGRAM_BATCH_SIZE
 
-from invenio_trends.utils import parse_iso_date
-from elasticsearch_dsl import Search
+from invenio_trends.analysis.binning import bin_index, rebin
+from invenio_trends.analysis.clustering import fit_predict, score_features, trending_cluster
+from invenio_trends.analysis.elasticsearch_backend import ElasticsearchBackend
+from invenio_trends.analysis.instrumentation import PipelineReport
+from invenio_trends.analysis.term_statistics import TermStatistics
+from invenio_trends.analysis.terms_matrix import TermsMatrix
 import numpy as np
 
 
@@ -43,185 +48,274 @@ logger = logging.getLogger(__name__)
 class TrendsDetector:
     """Trends analyzer and extractor."""
 
-    def __init__(self, config):
-        """Set up a new trends detector."""
-        self.client = Elasticsearch(hosts=SEARCH_ELASTIC_HOSTS)
-        self.index = config['index']
-        self.date_field = config['date_field']
-        self.analysis_field = config['analysis_field']
-        self.doc_type = config['doc_type']
+    def __init__(self, config, vectors_cache=None, histogram_cache=None, client=None, request_counter=None,
+                 backend=None, base_granularity=None):
+        """Set up a new trends detector running on given backend.
+
+        The default backend is the Elasticsearch one, built from config, client and caches (see
+        ElasticsearchBackend). If a base granularity is given, coarser histograms are fetched at that granularity
+        and re-binned locally.
+        """
+        self.vectors_cache = vectors_cache
+        self.base_granularity = base_granularity
+        self.cluster_centers = None
+        self.report = None
+        # counts histograms of the latest trends by granularity and term, over their background window
+        self.histograms = {}
+        self.backend = backend or ElasticsearchBackend(config, client, vectors_cache, histogram_cache,
+                                                       request_counter)
+        self.requests = self.backend.requests
 
     def run_pipeline(self, reference_date, granularity, foreground_window, background_window,
-                     minimum_frequency_threshold, smoothing_len, num_cluster, num_trends):
+                     minimum_frequency_threshold, smoothing_len, num_cluster, num_trends, maximum_candidates=None):
         """Run pipeline to find trends given parameters."""
         logger.debug('running trends pipeline for %s, %s over %s by %s', reference_date, foreground_window,
                      background_window, granularity)
         foreground_start = reference_date - foreground_window * granularity.value
         background_start = reference_date - background_window * granularity.value
-        smoothing_window = np.ones(smoothing_len)
-
-        ids = self.interval_ids(foreground_start, reference_date)
-        all_terms = self.term_vectors(ids)
-        terms = self.sorting_freq_threshold(all_terms, minimum_frequency_threshold)
-        hists = self.terms_histograms(terms, background_start, reference_date, granularity)
-        scores = self.hist_scores(hists, foreground_start, smoothing_window)
-        trending = self.classify_scores(scores, num_cluster)
-        trends = self.prune_scores(trending, num_trends)
+
+        report = self.report = PipelineReport(self.requests)
+
+        ids = report.measure('interval_ids', None, self.backend.interval_ids, foreground_start, reference_date)
+        all_terms = report.measure('term_statistics', len(ids), self.backend.term_statistics, ids)
+        if self.vectors_cache is not None:
+            self.vectors_cache.evict((background_window * granularity.value).total_seconds())
+        terms = report.measure('sorting_freq_threshold', len(all_terms), self.sorting_freq_threshold, all_terms,
+                               minimum_frequency_threshold, maximum_candidates)
+        hists = report.measure('histogram_matrix', len(terms), self.histogram_matrix, terms, background_start,
+                               reference_date, granularity)
+        return self.run_scoring(hists, foreground_start, smoothing_len, num_cluster, num_trends)
+
+    def run_cube_pipeline(self, cube, reference_date, foreground_window, background_window,
+                          minimum_frequency_threshold, smoothing_len, num_cluster, num_trends, maximum_candidates=None):
+        """Run pipeline on the counts of a term cube, only fetching bins newer than its watermark."""
+        logger.debug('running cube trends pipeline for %s, %s over %s by %s', reference_date, foreground_window,
+                     background_window, cube.granularity)
+        report = self.report = PipelineReport(self.requests)
+        end = cube.bin_index(reference_date) + 1
+        report.measure('update_cube', None, self.update_cube, cube, end, background_window)
+
+        foreground_start = cube.bin_date(end - foreground_window)
+        all_terms = report.measure('statistics', None, cube.statistics, end - foreground_window, end)
+        terms = report.measure('sorting_freq_threshold', len(all_terms), self.sorting_freq_threshold, all_terms,
+                               minimum_frequency_threshold, maximum_candidates)
+        hists = report.measure('cube_matrix', len(terms), self.cube_matrix, cube, terms, end - background_window,
+                               end)
+        trends = self.run_scoring(hists, foreground_start, smoothing_len, num_cluster, num_trends)
+        self.histograms[cube.granularity] = self.cube_histograms(cube, [term for term, stats, hist in trends],
+                                                                 end - background_window, end)
         return trends
 
-    def interval_ids(self, start, end):
-        """Retrieve list of ids occurring between start and end."""
-        logger.debug('retrieving ids from %s to %s', start, end)
-        q = Search(using=self.client, index=self.index) \
-            .fields(['']) \
-            .filter('exists', field=self.analysis_field) \
-            .filter('range', **{self.date_field: {'gt': start, 'lte': end}})
-        return [elem.meta.id for elem in q.scan()]
-
-    def term_vectors(self, ids, chunk=100):
-        """Retrieve all terms together with their stats."""
-        if not len(ids):
-            return []
-        logger.debug('retrieving term vectors for %s ids', len(ids))
-        vectors = []
-        for pos in range(0, len(ids), chunk):
-            q = self.client.mtermvectors(
-                index=self.index,
-                doc_type=self.doc_type,
-                ids=ids[pos:pos + chunk],
-                fields=[self.analysis_field],
-                field_statistics=False,
-                term_statistics=True,
-                offsets=False,
-                payloads=False,
-                positions=False,
-                realtime=True
-            )
-            for doc in q['docs']:
-                if self.analysis_field in doc['term_vectors']:
-                    vectors.append(doc['term_vectors'][self.analysis_field]['terms'])
-
-        assert len(ids) == len(vectors)
-        words = {}
-        for vec in vectors:
-            for word, freqs in vec.items():
-                if word in words:
-                    words[word]['term_freq'] += freqs['term_freq']
-                    words[word]['doc_freq'] += 1
-                else:
-                    words[word] = {
-                        'term_total': freqs['ttf'],  # estimate
-                        'doc_total': freqs['doc_freq'],  # estimate
-                        'term_freq': freqs['term_freq'],
-                        'doc_freq': 1,
-                    }
-        return words
-
-    def sorting_freq_threshold(self, terms, min_freq_threshold):
-        """Eliminated low frequency and sort dict into a list of tuple according to their frequency."""
+    def run_multi_pipeline(self, reference_date, windows, minimum_frequency_threshold, num_cluster, num_trends,
+                           maximum_candidates=None, cluster_centers=None):
+        """Run pipeline for many granularities at once, fetching histograms only at the base granularity.
+
+        Windows map each granularity to its (foreground window, background window, smoothing length). Foreground
+        statistics are fetched by nested slices, histograms of all candidates are fetched once over the widest
+        background and re-binned for each granularity. Cluster centers, if given, map granularities to the centers
+        warm-starting their clustering and are updated. Return trends by granularity.
+        """
+        base = self.base_granularity or min(windows, key=lambda granularity: granularity.value)
+        logger.debug('running trends pipeline for %s by %s out of %s', reference_date,
+                     ', '.join(granularity.name for granularity in windows), base.name)
+        report = self.report = PipelineReport(self.requests)
+
+        foreground_starts = [(reference_date - windows[granularity][0] * granularity.value, granularity)
+                             for granularity in windows]
+        words = TermStatistics()
+        candidates = {}
+        end = reference_date
+        for start, granularity in sorted(foreground_starts, key=itemgetter(0), reverse=True):
+            ids = report.measure('interval_ids', None, self.backend.interval_ids, start, end)
+            words.update(report.measure('term_statistics', len(ids), self.backend.term_statistics, ids))
+            candidates[granularity] = report.measure('sorting_freq_threshold', len(words),
+                                                     self.sorting_freq_threshold, words, minimum_frequency_threshold,
+                                                     maximum_candidates)
+            end = start
+        background_start = min(reference_date - windows[granularity][1] * granularity.value
+                               for granularity in windows)
+        if self.vectors_cache is not None:
+            self.vectors_cache.evict((reference_date - background_start).total_seconds())
+
+        terms = sorted(set(term for selected in candidates.values() for term, stats in selected))
+        batch = report.measure('date_histograms', len(terms), self.backend.date_histograms, background_start,
+                               reference_date, base, [None] + terms)
+        base_hists = dict(zip(terms, batch[1:]))
+
+        trends = {}
+        for granularity, (foreground_window, background_window, smoothing_len) in windows.items():
+            start = reference_date - background_window * granularity.value
+            hists = [(term, stats, self.slice_histogram(base_hists[term], start, base, granularity))
+                     for term, stats in candidates[granularity]]
+            matrix = report.measure('align_histograms:' + granularity.name, len(hists), self.align_histograms,
+                                    [hist for hist in hists if len(hist[2][1])],
+                                    self.slice_histogram(batch[0], start, base, granularity), granularity)
+            if cluster_centers is not None:
+                self.cluster_centers = cluster_centers.get(granularity)
+            trends[granularity] = self.run_scoring(matrix, reference_date - foreground_window * granularity.value,
+                                                   smoothing_len, num_cluster, num_trends, ':' + granularity.name)
+            selected = set(term for term, stats, hist in trends[granularity])
+            self.histograms[granularity] = dict((term, hist) for term, stats, hist in hists if term in selected)
+            if cluster_centers is not None:
+                cluster_centers[granularity] = self.cluster_centers
+        return trends
+
+    def run_scoring(self, hists, foreground_start, smoothing_len, num_cluster, num_trends, suffix=''):
+        """Run the scoring stages of the pipeline on a histograms matrix, suffixing their names in the report."""
+        scores = self.report.measure('matrix_scores' + suffix, len(hists), self.matrix_scores, hists,
+                                     foreground_start, smoothing_len)
+        trending = self.report.measure('classify_scores' + suffix, len(scores), self.classify_scores, scores,
+                                       num_cluster)
+        return self.report.measure('prune_scores' + suffix, len(trending), self.prune_scores, trending, num_trends)
+
+    def update_cube(self, cube, end, background_window, refresh=TRENDS_CUBE_REFRESH):
+        """Fetch bins of the cube between its watermark (minus a few refreshed bins) and end, then evict old ones.
+
+        Return the list of fetched bins.
+        """
+        start = end - background_window
+        if cube.watermark is not None:
+            start = max(start, cube.watermark - refresh + 1)
+        logger.info('updating cube bins %s to %s', start, end)
+        for index in range(start, end):
+            ids = self.backend.bin_ids(cube.bin_date(index), cube.bin_date(index + 1))
+            cube.add_bin(index, self.backend.term_statistics(ids))
+        cube.evict(end - background_window)
+        if self.vectors_cache is not None:
+            self.vectors_cache.evict((background_window * cube.granularity.value).total_seconds())
+        cube.save(end - 1)
+        return list(range(start, end))
+
+    def cube_matrix(self, cube, terms, start, end):
+        """Build the normalized histograms matrix of given terms from the cube bins in [start, end)."""
         if not len(terms):
-            return []
-        logger.debug('thresholding %s terms with minimum %s', len(terms), min_freq_threshold)
-        filtered = [(term, stats) for term, stats in terms.items() if stats['doc_freq'] >= min_freq_threshold]
-        return sorted(filtered, key=lambda elem: -elem[1]['doc_freq'])
+            return TermsMatrix.empty()
+        reference, counts = cube.histograms([term for term, stats in terms], start, end)
+        return TermsMatrix([term for term, stats in terms], [stats for term, stats in terms], start, cube.granularity,
+                           self.normalize_counts(counts, reference))
+
+    def cube_histograms(self, cube, terms, start, end):
+        """Return the (origin, counts) histograms of given terms from the cube bins in [start, end) by term."""
+        reference, counts = cube.histograms(terms, start, end)
+        return dict((term, self.trim_histogram(start, y.astype(np.int64))) for term, y in zip(terms, counts))
 
-    def terms_histograms(self, terms, start, end, gran):
-        """Retrieve all term histogram and normalize them."""
+    def sorting_freq_threshold(self, terms, min_freq_threshold, max_terms=None):
+        """Eliminated low frequency and sort statistics into a list of tuple according to their frequency.
+
+        Ties are broken by term, whatever the order statistics were folded in. If max_terms is given, only that many
+        most frequent terms are partially selected before sorting.
+        """
         if not len(terms):
             return []
-        hist_reference = self.date_histogram(start, end, gran)
-        hists = []
-        for term, stats in terms:
-            hist = self.date_histogram(start, end, gran, term=term)
-            logger.debug('retrieving %s histogram bins for %s', len(hist[0]), term)
-            if len(hist[0]):
-                hists.append((term, stats, self.normalize_histogram(hist, hist_reference)))
-        return hists
-
-    def hist_scores(self, hists, foreground_start, smoothing_window):
-        """Apply moving average and compute z-score relative to foreground."""
+        logger.debug('thresholding %s terms with minimum %s, keeping at most %s', len(terms), min_freq_threshold,
+                     max_terms)
+        doc_freq = np.asarray(terms.doc_freq)
+        selected = np.flatnonzero(doc_freq >= min_freq_threshold)
+        if max_terms is not None and len(selected) > max_terms:
+            kth = -np.partition(-doc_freq[selected], max_terms - 1)[max_terms - 1]
+            above = selected[doc_freq[selected] > kth]
+            ties = sorted(selected[doc_freq[selected] == kth], key=lambda i: terms.terms[i])
+            selected = np.concatenate([above, np.array(ties[:max_terms - len(above)], dtype=selected.dtype)])
+        selected = sorted(selected, key=lambda i: (-doc_freq[i], terms.terms[i]))
+        return [(terms.terms[i], terms.stats(i)) for i in selected]
+
+    def histogram_matrix(self, terms, start, end, gran, batch_size=TRENDS_HISTOGRAM_BATCH_SIZE):
+        """Retrieve all term histograms into a single matrix normalized w.r.t. the reference one."""
+        if not len(terms):
+            return TermsMatrix.empty()
+        logger.debug('retrieving histograms matrix for %s terms by batches of %s', len(terms), batch_size)
+        batch = self.date_histograms(start, end, gran, [None] + [term for term, stats in terms], batch_size)
+        hists = [(term, stats, hist) for (term, stats), hist in zip(terms, batch[1:]) if len(hist[1])]
+        return self.align_histograms(hists, batch[0], gran)
+
+    def slice_histogram(self, hist, start, base, granularity):
+        """Keep the bins of a base granularity histogram after start, re-binned to given granularity and trimmed."""
+        origin, y = hist
+        skipped = max(bin_index(start, base) + 1 - origin, 0)
+        return self.trim_histogram(*rebin(origin + skipped, y[skipped:], base, granularity))
+
+    def trim_histogram(self, origin, y):
+        """Trim (origin, counts) to its first and last non empty bins."""
+        nonzero = np.flatnonzero(y)
+        if not len(nonzero):
+            return 0, y[:0]
+        return origin + int(nonzero[0]), y[nonzero[0]:nonzero[-1] + 1]
+
+    def align_histograms(self, hists, hist_reference, granularity):
+        """Stack (term, stats, (origin, counts)) tuples onto the reference bins and normalize them all at once."""
+        origin_ref, y_ref = hist_reference
+        if not len(hists) or not len(y_ref):
+            return TermsMatrix.empty()
+        counts = np.zeros((len(hists), len(y_ref)))
+        for row, (term, stats, (origin, y)) in enumerate(hists):
+            offset = origin - origin_ref
+            counts[row, offset:offset + len(y)] = y
+
+        return TermsMatrix([term for term, stats, hist in hists], [stats for term, stats, hist in hists], origin_ref,
+                           granularity, self.normalize_counts(counts, y_ref))
+
+    def normalize_counts(self, counts, reference):
+        """Safely normalize each row of a counts matrix w.r.t. reference counts."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = counts / reference
+            values[~ np.isfinite(values)] = 0
+            return values
+
+    def matrix_scores(self, hists, foreground_start, smoothing_len):
+        """Apply moving average and compute z-score relative to foreground on the whole matrix at once.
+
+        Histograms spanning no more bins than the smoothing length have no scores.
+        """
         if not len(hists):
-            return []
-        scores = []
-        for term, stats, hist in hists:
-            score = self.transform_score(hist, foreground_start, smoothing_window)
-            scores.append((term, stats, score))
-        return scores
-
-    def classify_scores(self, scores, num_cluster):
-        """Extract best trending score cluster."""
+            return hists
+        if hists.values.shape[1] <= smoothing_len:
+            logger.warning('%s bins of %s histograms are too few to smooth over %s', hists.values.shape[1],
+                           hists.granularity.name, smoothing_len)
+            return TermsMatrix.empty()
+        cumsum = np.cumsum(np.hstack([np.zeros((len(hists), 1)), hists.values]), axis=1)
+        smoothed = cumsum[:, smoothing_len:] - cumsum[:, :-smoothing_len]
+
+        invalid = smoothing_len - 1
+        invalid_before = invalid // 2
+        foreground_index = min(bin_index(foreground_start, hists.granularity) - hists.origin, hists.values.shape[1] - 1)
+        foreground_index = max(foreground_index - invalid, 0)
+
+        mean = np.mean(smoothed, axis=1, keepdims=True)
+        std = np.std(smoothed, axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscores = (smoothed[:, foreground_index:] - mean) / std
+            zscores[~ np.isfinite(zscores)] = 0
+        return TermsMatrix(hists.terms, hists.stats, hists.origin + invalid_before + foreground_index,
+                           hists.granularity, zscores)
+
+    def classify_scores(self, scores, num_cluster, algorithm=TRENDS_CLUSTERING,
+                        features=TRENDS_CLUSTERING_FEATURES, random_state=TRENDS_CLUSTERING_SEED):
+        """Extract best trending score cluster from the scores matrix.
+
+        Clustering is warm-started from cluster_centers when set (e.g. by a previous run) and updates it.
+        """
         if not len(scores):
-            return []
-        km = KMeans(n_clusters=num_cluster)
-        values_only = [score for term, stats, (date, score) in scores]
-        logger.debug('classifying %s values', len(values_only))
-        pred = km.fit_predict(values_only)
-        clusters = km.cluster_centers_
-        trending_cluster = np.argmax(np.max(np.gradient(clusters, axis=1), axis=1))
-        selected = []
-        for i, (term, stats, hist) in enumerate(scores):
-            if pred[i] == trending_cluster:
-                selected.append((term, stats, hist))
-        return selected
+            return scores
+        values = score_features(scores.values, features)
+        pred, self.cluster_centers = fit_predict(values, num_cluster, algorithm, TRENDS_CLUSTERING_MINIBATCH,
+                                                 random_state, self.cluster_centers)
+        return scores.select(pred == trending_cluster(self.cluster_centers, features))
 
     def prune_scores(self, scores, num_trends):
         """Compute newness and keep only selected."""
         if not len(scores):
             return []
-        newest = sorted(scores, key=lambda x: -x[1]['doc_freq'] / x[1]['doc_total'])
-        logger.info(newest)
-        return newest[:num_trends]
+        newest = heapq.nlargest(num_trends, scores.to_list(), key=lambda x: x[1]['doc_freq'] / x[1]['doc_total'])
+        logger.debug('newest terms: %s', [term for term, stats, hist in newest])
+        return newest
 
     def date_histogram(self, start, end, granularity, term=None):
         """Retrieve the date histogram of all entries or a single term is given."""
-        q = Search(using=self.client, index=self.index)[0:0] \
-            .filter('range', **{self.date_field: {'gt': start, 'lte': end}})
-        if term is not None:
-            q = q.query('match_phrase', **{self.analysis_field: term})
-        q.aggs.bucket(
-            'hist',
-            'date_histogram',
-            field=self.date_field,
-            interval=granularity.name,
-            format='date_optional_time'
-        )
-        hist = q.execute().aggregations.hist.buckets
-
-        if not len(hist):
-            return np.array([]), np.array([])
-
-        x, y = zip(*[(parse_iso_date(elem.key_as_string), elem.doc_count) for elem in hist])
-        return np.array(x), np.array(y)
-
-    def normalize_histogram(self, hist_numerator, hist_denumerator):
-        """Safely normalize given tuple of lists w.r.t. another. Numerator size will be fitted to denumerator one."""
-        x, y = hist_numerator
-        x_ref, y_ref = hist_denumerator
-
-        before_count = np.where(x_ref == x[0])[0][0]
-        after_count = len(x_ref) - np.where(x_ref == x[-1])[0][0] - 1
-        y = np.append(np.zeros(before_count), np.append(y, np.zeros(after_count)))
-
-        with np.errstate(divide='ignore', invalid='ignore'):
-            res = np.divide(y, y_ref)
-            res[~ np.isfinite(res)] = 0
-            return x_ref, res
-
-    def transform_score(self, hist, foreground_start, smoothing_window):
-        """Score using moving average and z-score w.r.t. foreground."""
-        x, y = hist
-
-        y_s = np.convolve(y, smoothing_window, mode='valid')
-
-        invalid = len(y) - len(y_s)
-        invalid_before = invalid // 2
-        invalid_after = invalid_before + invalid % 2
-        x_s = x[invalid_before:-invalid_after] if invalid_before != 0 and invalid_after != 0 else x
-        assert len(x_s) == len(y_s)
-
-        foreground_index = np.where(x_s == foreground_start)[0][0]
-        x_fg = x_s[foreground_index - invalid_after:]
-        y_fg = y_s[foreground_index - invalid_after:]
+        return self.date_histograms(start, end, granularity, [term])[0]
 
-        zscore = (y_fg - np.mean(y_s)) / np.std(y_s)
-        return x_fg, zscore
+    def date_histograms(self, start, end, granularity, terms, batch_size=TRENDS_HISTOGRAM_BATCH_SIZE):
+        """Retrieve the date histograms of many terms at once, re-binning base granularity ones if coarser."""
+        if self.base_granularity is None or granularity.value <= self.base_granularity.value:
+            return self.backend.date_histograms(start, end, granularity, terms, batch_size)
+        return [rebin(origin, y, self.base_granularity, granularity)
+                for origin, y in self.backend.date_histograms(start, end, self.base_granularity, terms, batch_size)]
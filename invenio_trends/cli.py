@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Command line interface."""
+
+import csv
+import shutil
+import tempfile
+from datetime import datetime
+
+import click
+
+from invenio_trends.analysis.backtest import Backtest
+from invenio_trends.analysis.elasticsearch_backend import ElasticsearchBackend
+from invenio_trends.analysis.local_backend import DAY, LocalBackend
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.embedding_index import EmbeddingIndex
+
+from .config import TRENDS_BACKGROUND_WINDOW, TRENDS_FOREGROUND_WINDOW, TRENDS_MAXIMUM_CANDIDATES, \
+    TRENDS_MINIMUM_FREQUENCY_THRESHOLD, TRENDS_NUM, TRENDS_NUM_CLUSTER, TRENDS_PARAMS, TRENDS_SMOOTHING_LEN, \
+    TRENDS_SNAPSHOT_PATH
+
+
+def parse_day(ctx, param, value):
+    """Parse a YYYY-MM-DD option."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise click.BadParameter('expected YYYY-MM-DD, got %s' % value)
+
+
+@click.group()
+def trends():
+    """Trends commands."""
+
+
+@trends.command()
+@click.argument('path', type=click.Path(file_okay=False))
+@click.option('--start', required=True, callback=parse_day, help='First day (YYYY-MM-DD).')
+@click.option('--end', required=True, callback=parse_day, help='Last day (YYYY-MM-DD).')
+def snapshot(path, start, end):
+    """Export per day term counts of the trends index into a local snapshot."""
+    LocalBackend.export(path, ElasticsearchBackend(TRENDS_PARAMS), start, end + DAY)
+
+
+@trends.command()
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.argument('path', type=click.Path(file_okay=False))
+def embeddings(source, path):
+    """Build a local embedding index out of a word2vec text file of word vectors."""
+    EmbeddingIndex.build(path, source)
+
+
+@trends.command()
+@click.option('--start', required=True, callback=parse_day, help='First reference day (YYYY-MM-DD).')
+@click.option('--end', required=True, callback=parse_day, help='Last reference day (YYYY-MM-DD).')
+@click.option('--snapshot', 'path', type=click.Path(exists=True, file_okay=False), default=TRENDS_SNAPSHOT_PATH,
+              help='Local snapshot to read, the needed days are fetched from the trends index if missing.')
+@click.option('--foreground-window', type=int, default=TRENDS_FOREGROUND_WINDOW)
+@click.option('--background-window', type=int, default=TRENDS_BACKGROUND_WINDOW)
+@click.option('--minimum-frequency-threshold', type=int, default=TRENDS_MINIMUM_FREQUENCY_THRESHOLD)
+@click.option('--smoothing-len', type=int, default=TRENDS_SMOOTHING_LEN)
+@click.option('--num-cluster', type=int, default=TRENDS_NUM_CLUSTER)
+@click.option('--num-trends', type=int, default=TRENDS_NUM)
+@click.option('--maximum-candidates', type=int, default=TRENDS_MAXIMUM_CANDIDATES)
+@click.option('--output', '-o', type=click.File('w'), default='-', help='CSV file of date, term and score rows.')
+def backtest(start, end, path, foreground_window, background_window, minimum_frequency_threshold, smoothing_len,
+             num_cluster, num_trends, maximum_candidates, output):
+    """Compute daily trends of every reference day between start and end."""
+    tmp = None
+    if path is None:
+        tmp = path = tempfile.mkdtemp(prefix='trends-snapshot-')
+        click.echo('fetching %s days from the trends index' % ((end - start).days + background_window), err=True)
+        LocalBackend.export(path, ElasticsearchBackend(TRENDS_PARAMS), start - (background_window - 1) * DAY,
+                            end + DAY)
+    try:
+        local = LocalBackend(path)
+        writer = csv.writer(output)
+        writer.writerow(['date', 'term', 'score'])
+        rows = Backtest(TrendsDetector(TRENDS_PARAMS, backend=local), local).run(
+            start=start,
+            end=end,
+            foreground_window=foreground_window,
+            background_window=background_window,
+            minimum_frequency_threshold=minimum_frequency_threshold,
+            smoothing_len=smoothing_len,
+            num_cluster=num_cluster,
+            num_trends=num_trends,
+            maximum_candidates=maximum_candidates
+        )
+        for date, term, score in rows:
+            writer.writerow([date.date().isoformat(), term, '%.4f' % score])
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp)
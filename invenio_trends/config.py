@@ -37,6 +37,14 @@ CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
 WORD2VEC_TIMEOUT = 0.2  # seconds
 WORD2VEC_THRES = 0.7
 WORD2VEC_MAX = 5
+# word2vec expansions requested concurrently, kept in a local LRU and cached in redis for a week, failures included
+# for a few minutes only
+WORD2VEC_CONCURRENCY = 4
+WORD2VEC_CACHE_SIZE = 1024
+WORD2VEC_CACHE_TTL = 7 * 24 * 3600
+WORD2VEC_NEGATIVE_CACHE_TTL = 300
+# local embedding index answering instead of the word2vec api (disabled if None), built by the embeddings command
+WORD2VEC_LOCAL_PATH = os.environ.get('WORD2VEC_LOCAL_PATH')
 
 CELERYBEAT_SCHEDULE = {
     'update-index': {
@@ -76,6 +84,77 @@ TRENDS_MINIMUM_FREQUENCY_THRESHOLD = 5
 TRENDS_SMOOTHING_LEN = 7
 TRENDS_NUM_CLUSTER = 3
 TRENDS_NUM = 9
+# granularities of the published trends with their foreground window, background window and smoothing length in bins,
+# all computed together out of histograms fetched at the finest one and re-binned
+TRENDS_PUBLISHED_GRANULARITIES = {
+    TRENDS_GRANULARITY: (TRENDS_FOREGROUND_WINDOW, TRENDS_BACKGROUND_WINDOW, TRENDS_SMOOTHING_LEN),
+    Granularity.week: (4, 104, 3),
+    Granularity.month: (2, 24, 3),
+}
+# granularity at which searches and the pipeline fetch histograms to re-bin them to coarser ones, opt-in as long coarse
+# searches then cost many more buckets (natively fetched if None, the pipeline using the finest published one)
+TRENDS_BASE_GRANULARITY = None
+# most frequent foreground terms kept as candidates for the histograms stage (unbounded if None)
+TRENDS_MAXIMUM_CANDIDATES = 10000
+
+# clustering algorithm ('kmeans', 'minibatch' or 'auto' switching to mini-batch above a number of candidates),
+# clustered features ('series' of z-scores or 'summary' of slope, peak gradient and last value) and random seed
+TRENDS_CLUSTERING = 'auto'
+TRENDS_CLUSTERING_MINIBATCH = 2000
+TRENDS_CLUSTERING_FEATURES = 'series'
+TRENDS_CLUSTERING_SEED = 0
+TRENDS_CENTROIDS_REDIS_KEY = TRENDS_REDIS_KEY + ':centroids'
+
+# latest pipeline report and number of previous reports kept
+TRENDS_REPORT_REDIS_KEY = TRENDS_REDIS_KEY + ':report'
+TRENDS_REPORT_HISTORY = 90
+
+# elasticsearch client shared by the api, tasks and index synchronizer: persistent connections per host, request
+# timeout in seconds, retries on the other hosts, timeouts included, and gzip compressed responses
+TRENDS_ELASTICSEARCH_OPTIONS = {
+    'maxsize': 10,
+    'timeout': 30,
+    'max_retries': 3,
+    'retry_on_timeout': True,
+    'compress': True,
+}
+# timeout in seconds of the reindexing request of the index synchronizer
+TRENDS_REINDEX_TIMEOUT = 3600
+
+# number of terms per histograms request, keep terms x bins under the search buckets limit
+TRENDS_HISTOGRAM_BATCH_SIZE = 20
+# number of documents per term vectors request and number of such requests in flight
+TRENDS_TERM_VECTORS_CHUNK = 100
+TRENDS_TERM_VECTORS_CONCURRENCY = 4
+
+# directory of the incremental term count cube (disabled if None) and number of latest bins refetched every run
+TRENDS_CUBE_PATH = os.environ.get('TRENDS_CUBE_PATH')
+TRENDS_CUBE_REFRESH = 2
+
+# local snapshot directory of per day term counts the pipeline reads instead of the trends index (disabled if None)
+TRENDS_SNAPSHOT_PATH = os.environ.get('TRENDS_SNAPSHOT_PATH')
+
+# sqlite file caching per document term vectors (disabled if None)
+TRENDS_VECTORS_CACHE_PATH = os.environ.get('TRENDS_VECTORS_CACHE_PATH')
+
+# redis histograms cache expiration in seconds (disabled if None), entries are also invalidated by update_index
+TRENDS_HISTOGRAM_CACHE_TTL = 24 * 3600
+TRENDS_HISTOGRAM_CACHE_KEY = TRENDS_REDIS_KEY + ':histograms'
+
+# redis key of the emerging trends responses precomputed by update_trends and whether to store them gzip compressed
+TRENDS_EMERGING_REDIS_KEY = TRENDS_REDIS_KEY + ':emerging'
+TRENDS_EMERGING_COMPRESSION = True
+
+# identical concurrent searches computed once: redis key prefix, seconds the computing worker holds its lock and keeps
+# the result for the others, which poll for it at given interval, long enough to outlast elasticsearch requests with
+# all their retries
+TRENDS_SEARCH_FLIGHT_KEY = TRENDS_REDIS_KEY + ':search'
+TRENDS_SEARCH_FLIGHT_TIMEOUT = \
+    TRENDS_ELASTICSEARCH_OPTIONS['timeout'] * (TRENDS_ELASTICSEARCH_OPTIONS['max_retries'] + 1)
+TRENDS_SEARCH_FLIGHT_POLL = 0.05
+
+# redis key of the cached word2vec expansions
+WORD2VEC_CACHE_KEY = TRENDS_REDIS_KEY + ':word2vec'
 
 TRENDS_PARAMS = {
     'index': TRENDS_INDEX,
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Elasticsearch connections."""
+
+import urllib3
+from elasticsearch import Elasticsearch, RoundRobinSelector
+
+from invenio_trends.analysis.instrumentation import CountingConnection, RequestCounter
+
+
+class CompressedConnection(CountingConnection):
+    """Counting connection asking for gzip compressed responses if enabled."""
+
+    def __init__(self, compress=False, **kwargs):
+        """Set up connection, adding the accept encoding header if compress."""
+        super(CompressedConnection, self).__init__(**kwargs)
+        if compress:
+            self.headers.update(urllib3.make_headers(accept_encoding=True))
+
+
+class ElasticsearchConnections:
+    """Long-lived Elasticsearch client shared by the api, the tasks and the index synchronizer.
+
+    Every configured host gets a pool of persistent connections. Requests are spread round-robin over the hosts, a
+    failing one being marked dead for a while and the request retried on the next one. All requests are counted.
+    """
+
+    def __init__(self, hosts, connection_class=CompressedConnection, **options):
+        """Set up the client of given hosts, options being passed to its transport and connections."""
+        self.requests = RequestCounter()
+        self.client = Elasticsearch(hosts=hosts, connection_class=connection_class, counter=self.requests,
+                                    selector_class=RoundRobinSelector, **options)
+
+
+def without_retries(client):
+    """Return a client of the same hosts and connection options as given one, sending each request only once.
+
+    For requests not to be resent to another host after a client side timeout while the first one keeps running.
+    """
+    transport = client.transport
+    return Elasticsearch(hosts=transport.hosts, connection_class=transport.connection_class, max_retries=0,
+                         retry_on_timeout=False, **transport.kwargs)
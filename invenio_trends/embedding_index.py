@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Local word embedding index."""
+
+import io
+import logging
+import os
+
+import numpy as np
+
+from invenio_trends.similar_words import SimilarWords
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingIndex:
+    """Nearest neighbours of words by cosine similarity of their embeddings, as an alternative to the word2vec api.
+
+    The index directory holds the vocabulary and the words x dimensions matrix of unit norm float32 vectors,
+    memory-mapped so that processes opening the same index share its pages. It answers like SimilarWords, with the
+    same threshold, maximum and filtering of the term itself and of the words containing it.
+    """
+
+    def __init__(self, path, threshold, maximum):
+        """Open the index stored in given directory."""
+        self.path = path
+        self.threshold = threshold
+        self.maximum = maximum
+        with io.open(os.path.join(path, 'vocabulary.txt'), encoding='utf-8') as f:
+            self.words = f.read().splitlines()
+        self.ids = dict((word, i) for i, word in enumerate(self.words))
+        self.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        logger.debug('opened embedding index %s of %s words', path, len(self.words))
+
+    def lookup(self, term):
+        """Return the id of given term, its words being joined by dashes or nothing, None if unknown."""
+        for word in (term.replace(' ', '-'), term.replace(' ', '')):
+            if word in self.ids:
+                return self.ids[word]
+        return None
+
+    def expand(self, terms):
+        """Return the similar words of given terms as a dict, scoring all known ones with a single product."""
+        terms = list(set(terms))
+        known = [(term, self.lookup(term)) for term in terms]
+        known = [(term, i) for term, i in known if i is not None]
+        similar = dict((term, []) for term in terms)
+        if not known:
+            return similar
+
+        scores = np.dot(self.vectors, self.vectors[[i for term, i in known]].T)
+        for column, (term, i) in enumerate(known):
+            candidates = np.flatnonzero(scores[:, column] >= self.threshold)
+            candidates = candidates[np.argsort(-scores[candidates, column], kind='mergesort')]
+            for j in candidates:
+                word = self.words[j]
+                if j != i and term not in word:
+                    similar[term].append(word.replace('-', ' '))
+                    if len(similar[term]) == self.maximum:
+                        break
+        return similar
+
+    def submit(self, terms):
+        """Expand given terms right away, returning a dict of completed futures as SimilarWords does."""
+        return dict((term, SimilarWords.done(words)) for term, words in self.expand(terms).items())
+
+    @staticmethod
+    def build(path, source):
+        """Write an index of the vectors of a word2vec text file, skipping lines of unexpected size."""
+        logger.info('building embedding index %s from %s', path, source)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        words, vectors = [], []
+        with io.open(source, encoding='utf-8', errors='replace') as f:
+            dimensions = int(f.readline().split()[1])
+            for line in f:
+                fields = line.rstrip().split(' ')
+                if len(fields) != dimensions + 1:
+                    continue
+                words.append(fields[0])
+                vectors.append(np.array(fields[1:], dtype=np.float32))
+
+        vectors = np.array(vectors, dtype=np.float32).reshape(len(words), dimensions)
+        norms = np.linalg.norm(vectors, axis=1)
+        vectors /= np.where(norms > 0, norms, 1)[:, np.newaxis]
+        np.save(os.path.join(path, 'vectors.npy'), vectors)
+        with io.open(os.path.join(path, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+            for word in words:
+                f.write(word + u'\n')
+        logger.info('indexed %s words of %s dimensions', len(words), dimensions)
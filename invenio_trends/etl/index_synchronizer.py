@@ -27,10 +27,10 @@
 import logging
 
 import invenio_trends
-import requests as r
 
 from invenio_trends import analysis
-from invenio_trends.config import SEARCH_ELASTIC_HOSTS
+from invenio_trends.config import SEARCH_ELASTIC_HOSTS, TRENDS_ELASTICSEARCH_OPTIONS, TRENDS_REINDEX_TIMEOUT
+from invenio_trends.connections import ElasticsearchConnections, without_retries
 
 logger = logging.getLogger(__name__)
 
@@ -38,9 +38,9 @@ logger = logging.getLogger(__name__)
 class IndexSynchronizer:
     """Synchronization helper for maintaining another index type with customized analyser."""
 
-    def __init__(self, config):
-        """Unwrapping configuration defined in config.py."""
-        self.host = 'http://' + SEARCH_ELASTIC_HOSTS[0]
+    def __init__(self, config, client=None):
+        """Unwrapping configuration defined in config.py, requests going through given client if any."""
+        self.client = client or ElasticsearchConnections(SEARCH_ELASTIC_HOSTS, **TRENDS_ELASTICSEARCH_OPTIONS).client
 
         self.index = config['index']
         self.src_index = config['source_index']
@@ -61,7 +61,7 @@ class IndexSynchronizer:
 
     def setup_index(self):
         """Create analysis index if it does not exist yet."""
-        r.post(self.host + '/' + self.index)  # might already exist
+        self.client.indices.create(index=self.index, ignore=400)  # might already exist
 
     def setup_mappings(self):
         """Create mappings for analyzed field and date field (short index downtime)."""
@@ -93,7 +93,7 @@ class IndexSynchronizer:
             "properties": dict((field, type) for field, type in properties)
         }
 
-        res = r.put(self.host + '/' + self.index + '/_mapping/' + self.doc_type, json=mappings).json()
+        res = self.client.indices.put_mapping(index=self.index, doc_type=self.doc_type, body=mappings, ignore=400)
         if not res.get('acknowledged'):
             raise RuntimeError('cannot create mappings: %s' % res)
 
@@ -104,7 +104,7 @@ class IndexSynchronizer:
         self.close_index()
 
         analyser = self.analyzer_config()
-        res = r.put(self.host + '/' + self.index + '/_settings', json=analyser).json()
+        res = self.client.indices.put_settings(index=self.index, body=analyser, ignore=400)
 
         if not res.get('acknowledged'):
             raise RuntimeError('cannot add analyzer: %s' % res)
@@ -116,7 +116,8 @@ class IndexSynchronizer:
         """Reindex entries to new analysed type."""
         logger.info('reindex %s to %s started', self.src_index, self.index)
         reindex = self.synchronize_config()
-        res = r.post(self.host + '/_reindex', json=reindex).json()
+        # a retried reindex would run again alongside the timed out one still running on the cluster
+        res = without_retries(self.client).reindex(body=reindex, request_timeout=TRENDS_REINDEX_TIMEOUT)
 
         if res.get('timed_out'):
             raise RuntimeError('timeout during reindexing: %s' % res)
@@ -125,14 +126,14 @@ class IndexSynchronizer:
 
     def open_index(self):
         """Open an index or raise an exception."""
-        res = r.post(self.host + '/' + self.index + '/_open').json()
+        res = self.client.indices.open(index=self.index, ignore=(400, 404))
         if not res.get('acknowledged'):
             raise RuntimeError('cannot open index: %s' % res)
         logger.info('open index %s', self.index)
 
     def close_index(self):
         """Close an index or raise an exception."""
-        res = r.post(self.host + '/' + self.index + '/_close').json()
+        res = self.client.indices.close(index=self.index, ignore=(400, 404))
         if not res.get('acknowledged'):
             raise RuntimeError('cannot close index: %s' % res)
         logger.info('close index %s', self.index)
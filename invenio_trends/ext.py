@@ -24,6 +24,8 @@
 
 """Invenio module that adds a trends api to the platform."""
 
+from .config import SEARCH_ELASTIC_HOSTS, TRENDS_ELASTICSEARCH_OPTIONS
+from .connections import ElasticsearchConnections
 from .views import blueprint
 
 
@@ -38,6 +40,7 @@ class InvenioTrends(object):
     def init_app(self, app):
         """Flask application initialization."""
         self.init_config(app)
+        self.elasticsearch = ElasticsearchConnections(SEARCH_ELASTIC_HOSTS, **TRENDS_ELASTICSEARCH_OPTIONS)
         app.register_blueprint(blueprint)
         app.extensions['invenio-trends'] = self
 
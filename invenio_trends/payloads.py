@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Api payloads."""
+
+import hashlib
+import json
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from invenio_trends.analysis.binning import bin_starts
+from invenio_trends.analysis.downsampling import lttb
+from invenio_trends.utils import granularity_key, iso_dates
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# series as lists of date and value points, as date and value arrays, or as messagepack float64 typed arrays of epoch
+# milliseconds and values
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.invenio-trends.columnar+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+# available response formats, the default one first
+MIMETYPES = [JSON_MIMETYPE, COLUMNAR_MIMETYPE] + ([MSGPACK_MIMETYPE] if msgpack is not None else [])
+
+# window bits of zlib streams wrapped into a gzip container
+GZIP_WBITS = 31
+
+
+def search_payload(hists, start=None, end=None, granularity=None, related_terms=None, return_score=False,
+                   max_points=None, mimetype=JSON_MIMETYPE):
+    """Build the search response of given (term, (origin, counts)) histograms binned at given granularity.
+
+    Series longer than max_points are downsampled, the stats being computed beforehand on all bins. Their layout
+    depends on the response format.
+    """
+    minValue = 0
+    maxValue = 0
+    minDate = np.datetime64(end if end else datetime.max, 'ms')
+    maxDate = np.datetime64(start if start else datetime.min, 'ms')
+
+    data = []
+    for term, (origin, values) in hists:
+        dates = bin_starts(origin + np.arange(len(values)), granularity)
+        if return_score:
+            values = np.nan_to_num((values - np.mean(values)) / np.std(values))
+
+        if len(values):
+            minValue = min(minValue, values.min().item())
+            maxValue = max(maxValue, values.max().item())
+            minDate = min(minDate, dates[0])
+            maxDate = max(maxDate, dates[-1])
+
+        kept = lttb(values, max_points)
+        dates, values = dates[kept], values[kept]
+        if mimetype == MSGPACK_MIMETYPE:
+            data.append({'name': term, 'dates': dates.astype(np.int64).astype('<f8').tobytes(),
+                         'values': values.astype('<f8').tobytes()})
+        elif mimetype == COLUMNAR_MIMETYPE:
+            data.append({'name': term, 'dates': iso_dates(dates).tolist(), 'values': values.tolist()})
+        else:
+            data.append({'name': term, 'series': [{'date': date, 'value': value}
+                                                  for date, value in zip(iso_dates(dates).tolist(), values.tolist())]})
+
+    return {
+        'stats': {
+            'minValue': minValue,
+            'maxValue': maxValue,
+            'minDate': str(iso_dates(minDate)),
+            'maxDate': str(iso_dates(maxDate))
+        },
+        'related_terms': related_terms or {},
+        'data': data
+    }
+
+
+def serialize(payload, mimetype=JSON_MIMETYPE):
+    """Serialize a response payload into given format."""
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class PayloadCache:
+    """Redis store of serialized responses per granularity and format, with their version, timestamp and entity tags.
+
+    Responses are written once by the task computing them and served as they are, gzip compressed if enabled.
+    """
+
+    version = 2
+
+    def __init__(self, redis, key, compress=False):
+        """Set up a store keeping responses under given key."""
+        self.redis = redis
+        self.key = key
+        self.compress = compress
+
+    @staticmethod
+    def fields(mimetype):
+        """Return the stored hash fields of a response in given format."""
+        return 'body:' + mimetype, 'etag:' + mimetype, 'encoding', 'timestamp', 'version'
+
+    def store(self, granularity, payloads, timestamp=None):
+        """Serialize and store the responses of given granularity, given as a dict of payloads by format."""
+        self.redis.hmset(granularity_key(self.key, granularity), self.encode(payloads, timestamp))
+
+    def load(self, granularity, mimetype=JSON_MIMETYPE):
+        """Return (body, encoding, etag, timestamp) of the stored response or None if missing or outdated."""
+        return self.decode(self.redis.hmget(granularity_key(self.key, granularity), *self.fields(mimetype)))
+
+    def encode(self, payloads, timestamp=None):
+        """Serialize responses into the stored hash fields."""
+        mapping = {
+            'encoding': 'gzip' if self.compress else 'identity',
+            'timestamp': repr(timestamp if timestamp is not None else time.time()),
+            'version': self.version,
+        }
+        for mimetype, payload in payloads.items():
+            body = serialize(payload, mimetype)
+            mapping['etag:' + mimetype] = hashlib.sha1(body).hexdigest()
+            if self.compress:
+                compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, GZIP_WBITS)
+                body = compressor.compress(body) + compressor.flush()
+            mapping['body:' + mimetype] = body
+        return mapping
+
+    def decode(self, values):
+        """Convert stored hash field values, as returned by redis, back into a response."""
+        body, etag, encoding, timestamp, version = values
+        if body is None or version is None or int(version) != self.version:
+            return None
+        return body, encoding.decode('utf-8'), etag.decode('utf-8'), float(timestamp)
+
+    @staticmethod
+    def decompress(body, encoding):
+        """Return the plain body of a stored response."""
+        if encoding == 'gzip':
+            return zlib.decompress(body, GZIP_WBITS)
+        return body
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Word2vec expansion of search terms."""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from redis import RedisError
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarWords:
+    """Concurrent word2vec expansion of terms into their most similar words, cached in process and in redis.
+
+    Expansions are looked up in a local LRU, then in redis, and the missing ones are requested concurrently over a
+    pooled HTTP session. Failed requests, timeouts included, are cached as empty expansions for a shorter time so that
+    an unavailable service does not delay every search. Expansions read from redis are kept locally until they expire
+    there. Redis being unavailable only disables its cache.
+    """
+
+    def __init__(self, url, timeout, threshold, maximum, redis=None, prefix=None, ttl=None, negative_ttl=None,
+                 cache_size=1024, concurrency=4):
+        """Set up an expansion through the word2vec endpoint of given api url."""
+        self.url = url + '/word2vec'
+        self.timeout = timeout
+        self.threshold = threshold
+        self.maximum = maximum
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=concurrency))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=concurrency))
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def expand(self, terms):
+        """Return the similar words of given terms as a dict."""
+        return dict((term, future.result()) for term, future in self.submit(terms).items())
+
+    def submit(self, terms):
+        """Start expanding given terms and return a dict of futures of their similar words."""
+        futures = {}
+        missing = []
+        for term in set(terms):
+            words = self.get_local(term)
+            if words is None:
+                missing.append(term)
+            else:
+                futures[term] = self.done(words)
+        if missing and self.redis is not None:
+            for term, (words, ttl) in zip(missing, self.get_cached(missing)):
+                if words is not None:
+                    self.set_local(term, words, ttl)
+                    futures[term] = self.done(words)
+        for term in missing:
+            if term not in futures:
+                futures[term] = self.executor.submit(self.fetch, term)
+        return futures
+
+    def fetch(self, term):
+        """Request and cache the similar words of given term, an empty list if the request fails."""
+        try:
+            data = {'corpus': 'keywords', 'positive': [term.replace(' ', '')], 'negative': []}
+            res = self.session.post(self.url, json=data, timeout=self.timeout).json()
+            words, ttl = self.select(term, res['vector']), self.ttl
+        except Exception as e:
+            logger.error('word2vec expansion of %s failed: %s', term, e)
+            words, ttl = [], self.negative_ttl
+        self.set_local(term, words, ttl)
+        if self.redis is not None and ttl:
+            try:
+                self.redis.setex(self.key(term), int(ttl), json.dumps(words))
+            except RedisError as e:
+                logger.warning('caching word2vec expansion of %s failed: %s', term, e)
+        return words
+
+    def get_cached(self, terms):
+        """Return the (similar words, seconds to live) cached in redis for given terms, (None, None) if missing."""
+        pipeline = self.redis.pipeline(transaction=False)
+        for term in terms:
+            pipeline.get(self.key(term)).ttl(self.key(term))
+        try:
+            res = pipeline.execute()
+        except RedisError as e:
+            logger.warning('reading cached word2vec expansions failed: %s', e)
+            return [(None, None)] * len(terms)
+        cached = []
+        for data, ttl in zip(res[::2], res[1::2]):
+            if data is None:
+                cached.append((None, None))
+            else:
+                cached.append((json.loads(data.decode('utf-8')), ttl if ttl >= 0 else None))
+        return cached
+
+    def select(self, term, vector):
+        """Keep the best scored words of a (word, score) vector, excluding the ones containing the term."""
+        similarities = []
+        for word, score in sorted(vector, key=lambda e: -e[1]):
+            if score >= self.threshold and term not in word:
+                similarities.append(word.replace('-', ' '))
+        return similarities[:self.maximum]
+
+    def key(self, term):
+        """Return redis key of given term expansion."""
+        return '%s:%s' % (self.prefix, term)
+
+    def get_local(self, term):
+        """Return the locally cached expansion of given term, None if missing or expired."""
+        with self.lock:
+            entry = self.local.pop(term, None)
+            if entry is None or (entry[0] is not None and entry[0] < time.time()):
+                return None
+            self.local[term] = entry
+            return entry[1]
+
+    def set_local(self, term, words, ttl):
+        """Cache locally the expansion of given term for ttl seconds (forever if None), evicting the oldest one."""
+        with self.lock:
+            self.local.pop(term, None)
+            self.local[term] = (time.time() + ttl if ttl is not None else None, words)
+            while len(self.local) > self.cache_size:
+                self.local.popitem(last=False)
+
+    @staticmethod
+    def done(result):
+        """Return a completed future of given result."""
+        future = Future()
+        future.set_result(result)
+        return future
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Coalescing of identical concurrent computations."""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from redis.exceptions import LockError, RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Run a single computation of identical concurrent calls, sharing its result with the others.
+
+    Within a process, callers of an in-flight key wait on its future. Across processes, the computing one holds a
+    redis lock and publishes its result, bytes, for lock timeout seconds while the others poll for it, computing it
+    themselves if the lock is released without a result, it does not show up in time or redis is unavailable.
+    """
+
+    def __init__(self, redis=None, prefix=None, lock_timeout=10, poll_interval=0.05):
+        """Set up coalescing, across processes sharing given redis if any."""
+        self.redis = redis
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def key(self, params):
+        """Return the key of a computation identified by given json serializable parameters."""
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def do(self, params, compute):
+        """Return the result of compute(), shared by the concurrent calls of the same parameters."""
+        key = self.key(params)
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Future()
+        if not leader:
+            return flight.result()
+
+        try:
+            flight.set_result(self.share(key, compute))
+        except Exception as e:
+            flight.set_exception(e)
+        finally:
+            with self.lock:
+                del self.flights[key]
+        return flight.result()
+
+    def share(self, key, compute):
+        """Compute the result of given key once across processes."""
+        if self.redis is None:
+            return compute()
+
+        result_key = '%s:%s' % (self.prefix, key)
+        lock_key = result_key + ':lock'
+        lock = self.redis.lock(lock_key, timeout=self.lock_timeout)
+        try:
+            leader = lock.acquire(blocking=False)
+        except RedisError:
+            logger.warning('cannot coalesce computation of %s', key, exc_info=True)
+            return compute()
+
+        if leader:
+            try:
+                result = compute()
+                try:
+                    self.redis.setex(result_key, self.lock_timeout, result)
+                except RedisError:
+                    logger.warning('cannot publish computation of %s', key, exc_info=True)
+                return result
+            finally:
+                try:
+                    lock.release()
+                except LockError:
+                    logger.warning('computation of %s outlived its lock', key)
+                except RedisError:
+                    logger.warning('cannot release lock of %s', key, exc_info=True)
+
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            try:
+                # lock first: once released, the result is there unless the computation failed
+                locked, result = self.redis.pipeline(transaction=False).exists(lock_key).get(result_key).execute()
+            except RedisError:
+                logger.warning('cannot wait for computation of %s', key, exc_info=True)
+                return compute()
+            if result is not None:
+                return result
+            if not locked:
+                logger.warning('computation of %s by another process failed', key)
+                return compute()
+            time.sleep(self.poll_interval)
+        logger.warning('computation of %s by another process timed out', key)
+        return compute()
@@ -24,58 +24,156 @@
 
 """Tasks to be periodically scheduled."""
 
+import json
 import logging
 from datetime import datetime
+from io import BytesIO
 
+import numpy as np
 from celery import shared_task
 from redis import StrictRedis
 
+from invenio_trends.analysis.binning import bin_date, bin_index
+from invenio_trends.analysis.histogram_cache import HistogramCache
+from invenio_trends.analysis.local_backend import LocalBackend
+from invenio_trends.analysis.term_cube import TermCube
+from invenio_trends.analysis.term_vectors_cache import TermVectorsCache
 from invenio_trends.analysis.trends_detector import TrendsDetector
 from invenio_trends.etl.index_synchronizer import IndexSynchronizer
 
-from .config import CACHE_REDIS_URL, TRENDS_BACKGROUND_WINDOW, \
-    TRENDS_FOREGROUND_WINDOW, TRENDS_GRANULARITY, \
-    TRENDS_MINIMUM_FREQUENCY_THRESHOLD, TRENDS_NUM, TRENDS_NUM_CLUSTER, \
-    TRENDS_PARAMS, TRENDS_REDIS_KEY, TRENDS_SMOOTHING_LEN
+from .config import CACHE_REDIS_URL, TRENDS_BACKGROUND_WINDOW, TRENDS_BASE_GRANULARITY, TRENDS_CENTROIDS_REDIS_KEY, \
+    TRENDS_CUBE_PATH, TRENDS_EMERGING_COMPRESSION, TRENDS_EMERGING_REDIS_KEY, TRENDS_FOREGROUND_WINDOW, \
+    TRENDS_GRANULARITY, TRENDS_HISTOGRAM_CACHE_KEY, TRENDS_HISTOGRAM_CACHE_TTL, TRENDS_MAXIMUM_CANDIDATES, \
+    TRENDS_MINIMUM_FREQUENCY_THRESHOLD, TRENDS_NUM, TRENDS_NUM_CLUSTER, TRENDS_PARAMS, TRENDS_PUBLISHED_GRANULARITIES, \
+    TRENDS_REDIS_KEY, TRENDS_REPORT_HISTORY, TRENDS_REPORT_REDIS_KEY, TRENDS_SMOOTHING_LEN, TRENDS_SNAPSHOT_PATH, \
+    TRENDS_VECTORS_CACHE_PATH
+from .payloads import MIMETYPES, PayloadCache, search_payload
+from .proxies import current_trends
+from .utils import granularity_key, iso_dates
 
 logger = logging.getLogger(__name__)
 redis = StrictRedis.from_url(CACHE_REDIS_URL)
+histogram_cache = HistogramCache(redis, TRENDS_HISTOGRAM_CACHE_KEY, TRENDS_HISTOGRAM_CACHE_TTL) \
+    if TRENDS_HISTOGRAM_CACHE_TTL else None
+emerging_cache = PayloadCache(redis, TRENDS_EMERGING_REDIS_KEY, TRENDS_EMERGING_COMPRESSION)
 
 
 @shared_task(ignore_result=True)
 def update_index():
     """Synchronize index to refresh all new entries into the trends index."""
     logging.info('updating index')
-    index_sync = IndexSynchronizer(TRENDS_PARAMS)
+    index_sync = IndexSynchronizer(TRENDS_PARAMS, current_trends.elasticsearch.client)
     index_sync.setup_index()
     index_sync.setup_analyzer()
     index_sync.setup_mappings()
     index_sync.synchronize()
+    if histogram_cache is not None:
+        histogram_cache.invalidate()
 
 
 @shared_task(ignore_result=True)
 def update_trends():
     """Compute trends for the current day and cache them."""
     logging.info('updating trends')
-    td = TrendsDetector(TRENDS_PARAMS)
-    trends = td.run_pipeline(
-        reference_date=datetime.now(),
-        granularity=TRENDS_GRANULARITY,
-        foreground_window=TRENDS_FOREGROUND_WINDOW,
-        background_window=TRENDS_BACKGROUND_WINDOW,
-        minimum_frequency_threshold=TRENDS_MINIMUM_FREQUENCY_THRESHOLD,
-        smoothing_len=TRENDS_SMOOTHING_LEN,
-        num_cluster=TRENDS_NUM_CLUSTER,
-        num_trends=TRENDS_NUM
-    )
+    vectors_cache = None
+    if TRENDS_VECTORS_CACHE_PATH:
+        analyzer_config = IndexSynchronizer(TRENDS_PARAMS, current_trends.elasticsearch.client).analyzer_config()
+        vectors_cache = TermVectorsCache(TRENDS_VECTORS_CACHE_PATH, analyzer_config)
+    backend = LocalBackend(TRENDS_SNAPSHOT_PATH) if TRENDS_SNAPSHOT_PATH else None
+    elasticsearch = current_trends.elasticsearch
+    # candidate histograms are not cached, the next run reads them from another generation of the index
+    td = TrendsDetector(TRENDS_PARAMS, vectors_cache=vectors_cache, client=elasticsearch.client,
+                        request_counter=elasticsearch.requests, backend=backend,
+                        base_granularity=TRENDS_BASE_GRANULARITY)
+    reference_date = datetime.now()
+    windows = dict(TRENDS_PUBLISHED_GRANULARITIES)
+    cluster_centers = dict((granularity, load_array(granularity_key(TRENDS_CENTROIDS_REDIS_KEY, granularity)))
+                           for granularity in set(windows) | set([TRENDS_GRANULARITY]))
+    trends = {}
+    cube_stages = []
+    if TRENDS_CUBE_PATH:
+        # the cube only holds bins of the main granularity, the other published ones are computed as usual
+        foreground_window, background_window, smoothing_len = windows.pop(
+            TRENDS_GRANULARITY, (TRENDS_FOREGROUND_WINDOW, TRENDS_BACKGROUND_WINDOW, TRENDS_SMOOTHING_LEN))
+        td.cluster_centers = cluster_centers[TRENDS_GRANULARITY]
+        trends[TRENDS_GRANULARITY] = td.run_cube_pipeline(
+            cube=TermCube(TRENDS_CUBE_PATH, TRENDS_GRANULARITY),
+            reference_date=reference_date,
+            foreground_window=foreground_window,
+            background_window=background_window,
+            minimum_frequency_threshold=TRENDS_MINIMUM_FREQUENCY_THRESHOLD,
+            smoothing_len=smoothing_len,
+            num_cluster=TRENDS_NUM_CLUSTER,
+            num_trends=TRENDS_NUM,
+            maximum_candidates=TRENDS_MAXIMUM_CANDIDATES
+        )
+        cluster_centers[TRENDS_GRANULARITY] = td.cluster_centers
+        cube_stages = td.report.stages
+    if windows:
+        trends.update(td.run_multi_pipeline(
+            reference_date=reference_date,
+            windows=windows,
+            minimum_frequency_threshold=TRENDS_MINIMUM_FREQUENCY_THRESHOLD,
+            num_cluster=TRENDS_NUM_CLUSTER,
+            num_trends=TRENDS_NUM,
+            maximum_candidates=TRENDS_MAXIMUM_CANDIDATES,
+            cluster_centers=cluster_centers
+        ))
+        td.report.stages[:0] = cube_stages
+    for granularity, centers in cluster_centers.items():
+        if centers is not None:
+            store_array(granularity_key(TRENDS_CENTROIDS_REDIS_KEY, granularity), centers)
+    report = json.dumps(td.report.to_dict())
+    redis.pipeline().set(TRENDS_REPORT_REDIS_KEY, report) \
+        .lpush(TRENDS_REPORT_REDIS_KEY + ':history', report) \
+        .ltrim(TRENDS_REPORT_REDIS_KEY + ':history', 0, TRENDS_REPORT_HISTORY - 1) \
+        .execute()
+    for granularity, detected in trends.items():
+        publish_trends(td, granularity, detected, reference_date)
+
+
+def publish_trends(td, granularity, trends, reference_date):
+    """Cache trends of given granularity along with the emerging trends response built from their histograms.
+
+    Trends are published from their first foreground bin until the reference date, their histograms being sliced out
+    of the ones the detector computed them from, or fetched if it does not hold them.
+    """
     if not len(trends):
         return
     terms, dates = zip(*[(term, date) for term, stats, (date, score) in trends])
-    logger.info('trends detected: %s', terms)
+    logger.info('%s trends detected: %s', granularity.name, terms)
+    start, end = dates[0].min().astype(object), reference_date
+    iso_start, iso_end = iso_dates([start, end])
     mapping = {
         'terms': ','.join(terms),
-        'start': min(dates[0]).isoformat(),
-        'end': max(dates[0]).isoformat(),
-        'granularity': TRENDS_GRANULARITY.name
+        'start': str(iso_start),
+        'end': str(iso_end),
+        'granularity': granularity.name
     }
-    assert(1, redis.hmset(TRENDS_REDIS_KEY, mapping))
+    redis.hmset(granularity_key(TRENDS_REDIS_KEY, granularity), mapping)
+    # entries are counted after the end of the previous bin so that the first foreground one is whole
+    previous = bin_date(bin_index(start, granularity) - 1, granularity)
+    histograms = td.histograms.get(granularity, {})
+    if not all(term in histograms for term in terms):
+        histograms = dict(zip(terms, td.date_histograms(previous, end, granularity, list(terms))))
+    hists = [td.slice_histogram(histograms[term], previous, granularity, granularity) for term in terms]
+    related_terms = dict((term, []) for term in terms)
+    emerging_cache.store(granularity, dict(
+        (mimetype, search_payload(list(zip(terms, hists)), start, end, granularity, related_terms, mimetype=mimetype))
+        for mimetype in MIMETYPES
+    ))
+
+
+def load_array(key):
+    """Load a numpy array stored in redis or None if missing."""
+    data = redis.get(key)
+    if data is None:
+        return None
+    return np.load(BytesIO(data))
+
+
+def store_array(key, array):
+    """Store a numpy array in redis."""
+    buffer = BytesIO()
+    np.save(buffer, array)
+    redis.set(key, buffer.getvalue())
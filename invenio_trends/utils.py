@@ -26,9 +26,11 @@
 
 from datetime import datetime
 
+import numpy as np
 from werkzeug.routing import BaseConverter
 
 from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.config import TRENDS_GRANULARITY
 
 
 def return_iso_date(obj):
@@ -38,6 +40,11 @@ def return_iso_date(obj):
     return obj.isoformat()
 
 
+def iso_dates(dates):
+    """Print given dates (datetimes or datetime64) to ISO8601 without timezone at once."""
+    return np.datetime_as_string(np.asarray(dates, dtype='datetime64[ms]'), unit='s')
+
+
 def parse_iso_date(str):
     """Parse given date to ISO8601 without timezone."""
     try:
@@ -51,6 +58,13 @@ def parse_iso_date(str):
     return datetime.strptime(str, '%Y-%m-%dT%H:%M:%S')
 
 
+def granularity_key(key, granularity):
+    """Return redis key of given granularity, the default trends granularity keeping the plain key."""
+    if granularity == TRENDS_GRANULARITY:
+        return key
+    return key + ':' + granularity.name
+
+
 class DatetimeConverter(BaseConverter):
     """Datetime/url converter."""
 
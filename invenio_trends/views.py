@@ -27,25 +27,41 @@
 import logging
 from datetime import datetime
 
-import numpy as np
-import requests as r
-from elasticsearch import Elasticsearch
 from elasticsearch_dsl import Search
 from flask import Blueprint, jsonify, make_response, request
 from redis import StrictRedis
 
 from .analysis.granularity import Granularity
+from .analysis.histogram_cache import HistogramCache
 from .analysis.trends_detector import TrendsDetector
-from .config import CACHE_REDIS_URL, MAGPIE_API_URL, SEARCH_ELASTIC_HOSTS, \
-    TRENDS_DATE_FIELD, TRENDS_ENDPOINT, TRENDS_HIST_GRANULARITY, \
-    TRENDS_INDEX, TRENDS_PARAMS, TRENDS_REDIS_KEY, WORD2VEC_MAX, \
-    WORD2VEC_THRES, WORD2VEC_TIMEOUT, TRENDS_FOREGROUND_WINDOW, TRENDS_SMOOTHING_LEN
-from .utils import DatetimeConverter, GranularityConverter, parse_iso_date, \
-    return_iso_date
+from .config import CACHE_REDIS_URL, MAGPIE_API_URL, TRENDS_BASE_GRANULARITY, \
+    TRENDS_DATE_FIELD, TRENDS_EMERGING_COMPRESSION, TRENDS_EMERGING_REDIS_KEY, TRENDS_ENDPOINT, \
+    TRENDS_GRANULARITY, TRENDS_HIST_GRANULARITY, \
+    TRENDS_HISTOGRAM_CACHE_KEY, TRENDS_HISTOGRAM_CACHE_TTL, TRENDS_INDEX, \
+    TRENDS_PARAMS, TRENDS_REDIS_KEY, TRENDS_SEARCH_FLIGHT_KEY, TRENDS_SEARCH_FLIGHT_POLL, \
+    TRENDS_SEARCH_FLIGHT_TIMEOUT, WORD2VEC_CACHE_KEY, WORD2VEC_CACHE_SIZE, WORD2VEC_CACHE_TTL, \
+    WORD2VEC_CONCURRENCY, WORD2VEC_LOCAL_PATH, WORD2VEC_MAX, WORD2VEC_NEGATIVE_CACHE_TTL, WORD2VEC_THRES, \
+    WORD2VEC_TIMEOUT, \
+    TRENDS_FOREGROUND_WINDOW, TRENDS_SMOOTHING_LEN
+from .embedding_index import EmbeddingIndex
+from .payloads import JSON_MIMETYPE, MIMETYPES, PayloadCache, search_payload, serialize
+from .proxies import current_trends
+from .similar_words import SimilarWords
+from .single_flight import SingleFlight
+from .utils import DatetimeConverter, GranularityConverter, granularity_key, parse_iso_date
 
 logger = logging.getLogger(__name__)
-client = Elasticsearch(hosts=SEARCH_ELASTIC_HOSTS)
 redis = StrictRedis.from_url(CACHE_REDIS_URL)
+histogram_cache = HistogramCache(redis, TRENDS_HISTOGRAM_CACHE_KEY, TRENDS_HISTOGRAM_CACHE_TTL) \
+    if TRENDS_HISTOGRAM_CACHE_TTL else None
+emerging_cache = PayloadCache(redis, TRENDS_EMERGING_REDIS_KEY, TRENDS_EMERGING_COMPRESSION)
+search_flight = SingleFlight(redis, TRENDS_SEARCH_FLIGHT_KEY, TRENDS_SEARCH_FLIGHT_TIMEOUT, TRENDS_SEARCH_FLIGHT_POLL)
+if WORD2VEC_LOCAL_PATH:
+    similar_words_expansion = EmbeddingIndex(WORD2VEC_LOCAL_PATH, WORD2VEC_THRES, WORD2VEC_MAX)
+else:
+    similar_words_expansion = SimilarWords(MAGPIE_API_URL, WORD2VEC_TIMEOUT, WORD2VEC_THRES, WORD2VEC_MAX, redis,
+                                           WORD2VEC_CACHE_KEY, WORD2VEC_CACHE_TTL, WORD2VEC_NEGATIVE_CACHE_TTL,
+                                           WORD2VEC_CACHE_SIZE, WORD2VEC_CONCURRENCY)
 
 
 def register_converters(state):
@@ -70,7 +86,7 @@ def granularities():
 @blueprint.route('/dates')
 def dates():
     """Return maximum and minimum date from dataset."""
-    q = Search(using=client, index=TRENDS_INDEX)[0:0]
+    q = Search(using=current_trends.elasticsearch.client, index=TRENDS_INDEX)[0:0]
     q.aggs.bucket('min_date', 'min', field=TRENDS_DATE_FIELD)
     q.aggs.bucket('max_date', 'max', field=TRENDS_DATE_FIELD)
     res = q.execute().aggregations
@@ -85,22 +101,39 @@ def search_trends(query, start=None, end=None, gran=None):
     """Return histogram matching query."""
     similar_words = request.args.get('similar_words') is not None
     return_score = request.args.get('return_score') is not None
-    return search(query, start, end, gran, similar_words, return_score)
+    max_points = request.args.get('max_points', type=int)
+    if 'max_points' in request.args and (max_points is None or max_points < 3):
+        return bad_request('max_points must be an integer of at least 3')
+    return search(query, start, end, gran, similar_words, return_score, max_points, negotiate())
 
 
 @blueprint.route('/emerging')
 def emerging_trends():
-    """Return cached latest trends."""
-    cached = redis.hmget(TRENDS_REDIS_KEY, 'terms', 'start', 'end', 'granularity')
+    """Return cached latest trends, of the granularity given as argument if any."""
+    key = TRENDS_REDIS_KEY
+    if request.args.get('granularity') is not None:
+        if request.args['granularity'] not in Granularity.__members__:
+            return bad_request('unknown granularity')
+        granularity = Granularity[request.args['granularity']]
+        key = granularity_key(TRENDS_REDIS_KEY, granularity)
+    else:
+        granularity = TRENDS_GRANULARITY
+    mimetype = negotiate()
+    precomputed = emerging_cache.load(granularity, mimetype)
+    if precomputed is not None:
+        return precomputed_response(mimetype, *precomputed)
+
+    cached = redis.hmget(key, 'terms', 'start', 'end', 'granularity')
     if cached[0] is None:
         return jsonify({})
 
     terms, start, end, gran = cached
-    return search(terms, parse_iso_date(start), parse_iso_date(end), Granularity[gran])
+    return search(terms, parse_iso_date(start), parse_iso_date(end), Granularity[gran], mimetype=mimetype)
 
 
-def search(query, start=None, end=None, gran=None, similar_words=False, return_score=False):
-    """Search index for given query string and return corresponding histograms."""
+def search(query, start=None, end=None, gran=None, similar_words=False, return_score=False, max_points=None,
+           mimetype=JSON_MIMETYPE):
+    """Search index for given query string and return corresponding histograms, downsampled to max_points if given."""
     if not gran:
         gran = TRENDS_HIST_GRANULARITY
 
@@ -108,61 +141,71 @@ def search(query, start=None, end=None, gran=None, similar_words=False, return_s
     if not len(terms):
         return bad_request('no terms')
 
-    td = TrendsDetector(TRENDS_PARAMS)
-    minValue = 0
-    maxValue = 0
-    minDate = end if end else datetime.max
-    maxDate = start if start else datetime.min
+    # identical concurrent searches, across workers too, are computed once
+    params = [terms, [date.isoformat() if date else None for date in (start, end)], gran.name,
+              similar_words, return_score, max_points, mimetype]
+
+    def compute():
+        hists, related_terms = search_histograms(terms, start, end, gran, similar_words)
+        payload = search_payload(hists, start, end, gran, related_terms, return_score, max_points, mimetype)
+        return serialize(payload, mimetype)
+
+    response = make_response(search_flight.do(params, compute))
+    response.mimetype = mimetype
+    response.vary.add('Accept')
+    return response
+
+
+def search_histograms(terms, start, end, gran, similar_words):
+    """Return the (term, histogram) of given terms and of their similar words if asked, and the similar words."""
+    td = TrendsDetector(TRENDS_PARAMS, histogram_cache=histogram_cache, client=current_trends.elasticsearch.client,
+                        request_counter=current_trends.elasticsearch.requests, base_granularity=TRENDS_BASE_GRANULARITY)
+
+    # histograms of the queried terms are fetched while their expansions are in flight
+    expansions = similar_words_expansion.submit(terms) if similar_words else {}
+    fetched = fetch_histograms(td, start, end, gran, terms)
 
     all_terms = []
     related_terms = {}
     for term in terms:
-        similarities = word2vec(term) if similar_words else []
+        similarities = expansions[term].result() if similar_words else []
         related_terms[term] = similarities
         all_terms.append(term)
         all_terms.extend(similarities)
 
-    data = []
-    for term in all_terms:
-        dates, values = td.date_histogram(start, end, gran, term)
-        if return_score:
-            values = np.nan_to_num((values - np.mean(values)) / np.std(values))
-
-        if len(values):
-            minValue = min(minValue, min(values))
-            maxValue = max(maxValue, max(values))
-            minDate = min(minDate, min(dates))
-            maxDate = max(maxDate, max(dates))
-
-        series = [{'date': return_iso_date(date), 'value': value} for date, value in zip(dates, values)]
-        data.append({'name': term, 'series': series})
-
-    ret = {
-        'stats': {
-            'minValue': minValue,
-            'maxValue': maxValue,
-            'minDate': return_iso_date(minDate),
-            'maxDate': return_iso_date(maxDate)
-        },
-        'related_terms': related_terms,
-        'data': data
-    }
-    return jsonify(ret)
-
-
-def word2vec(term):
-    """Fetch associates words and select them following their matching scores."""
-    try:
-        data = {'corpus': 'keywords', 'positive': [term.replace(' ', '')], 'negative': []}
-        res = r.post(MAGPIE_API_URL + '/word2vec', json=data, timeout=WORD2VEC_TIMEOUT).json()
-        similarities = []
-        for word, score in sorted(res['vector'], key=lambda e: -e[1]):
-            if score >= WORD2VEC_THRES and term not in word:
-                similarities.append(word.replace('-', ' '))
-        return similarities[:WORD2VEC_MAX]
-    except Exception as e:
-        logger.error(e)
-        return []
+    fetched.update(fetch_histograms(td, start, end, gran, [term for term in all_terms if term not in fetched]))
+    return [(term, fetched[term]) for term in all_terms], related_terms
+
+
+def negotiate():
+    """Return the response format best matching the accepted ones, json points by default."""
+    return request.accept_mimetypes.best_match(MIMETYPES, default=JSON_MIMETYPE)
+
+
+def precomputed_response(mimetype, body, encoding, etag, timestamp):
+    """Serve a stored response, compressed if the client accepts it and revalidated through its entity tag.
+
+    Compressed and plain bodies are distinct representations, hence tagged differently.
+    """
+    if encoding != 'identity' and encoding not in request.accept_encodings:
+        body, encoding = PayloadCache.decompress(body, encoding), 'identity'
+    response = make_response(body)
+    response.mimetype = mimetype
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    response.set_etag('%s-%s' % (etag, encoding))
+    response.last_modified = datetime.utcfromtimestamp(timestamp)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def fetch_histograms(td, start, end, gran, terms):
+    """Return the histograms of given terms as a dict, fetching all distinct terms in a single request."""
+    unique_terms = sorted(set(terms), key=terms.index)
+    if not len(unique_terms):
+        return {}
+    return dict(zip(unique_terms, td.date_histograms(start, end, gran, unique_terms, len(unique_terms))))
 
 
 def bad_request(e=''):
@@ -55,6 +55,9 @@ extras_require = {
         'pylab',
         'wordcloud'
     ],
+    'msgpack': [
+        'msgpack-python>=0.4.8',
+    ],
 }
 
 extras_require['all'] = []
@@ -72,12 +75,14 @@ install_requires = [
     'numpy>=1.11.1',
     'enum34>=1.1.6',
     'redis>=2.10.5',
+    'requests>=2.11.0',
     'celery>=3.1.23',
     'scipy>=0.18.0',
     'scikit-learn>=0.17.1',
+    'futures>=3.0.5;python_version=="2.7"',
 ]
 
-packages = find_packages()
+packages = find_packages(exclude=['benchmarks', 'benchmarks.*'])
 
 # Get the version string. Cannot be done with import!
 g = {}
@@ -106,6 +111,9 @@ setup(
         'invenio_celery.tasks': [
             'invenio_trends = invenio_trends.tasks'
         ],
+        'flask.commands': [
+            'trends = invenio_trends.cli:trends'
+        ],
     },
     extras_require=extras_require,
     install_requires=install_requires,
@@ -24,9 +24,20 @@
 
 """Pytest configuration."""
 
+from collections import Counter
+from datetime import datetime
+
 import pytest
 from flask import Flask
 
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_elasticsearch import FakeCluster, FakeConnection
+from benchmarks.fake_redis import FakeRedis
+from invenio_trends.analysis.local_backend import LocalBackend, day_index
+from invenio_trends.analysis.term_statistics import TermStatistics
+from invenio_trends.config import TRENDS_INDEX
+from invenio_trends.connections import ElasticsearchConnections
+
 
 @pytest.fixture()
 def app():
@@ -36,3 +47,67 @@ def app():
         TESTING=True
     )
     return app
+
+
+def term_statistics(*vectors):
+    """Build term statistics of documents given as lists of terms or term frequencies, with constant estimates."""
+    words = TermStatistics()
+    for vector in vectors:
+        words.add(dict((term, {'term_freq': freq, 'ttf': 10, 'doc_freq': 5}) for term, freq in Counter(vector).items()))
+    return words
+
+
+class DaysSource:
+    """Export source serving documents, given as lists of terms, by day index."""
+
+    def __init__(self, days):
+        """Serve given days."""
+        self.days = days
+
+    def bin_ids(self, start, end):
+        """Return (day, position) ids of the documents of the day starting at start."""
+        return [(day_index(start), i) for i in range(len(self.days.get(day_index(start), [])))]
+
+    def term_statistics(self, ids):
+        """Return the statistics of given documents."""
+        return term_statistics(*[self.days[day][i] for day, i in ids])
+
+
+@pytest.fixture()
+def statistics():
+    """Term statistics builder (see term_statistics)."""
+    return term_statistics
+
+
+@pytest.fixture()
+def export_snapshot(tmpdir):
+    """Export documents, given as lists of terms by day index, from start until end into a local snapshot."""
+    def export(days, start, end):
+        return LocalBackend.export(str(tmpdir), DaysSource(days), start, end)
+    return export
+
+
+@pytest.fixture()
+def corpus():
+    """Synthetic documents with bursts ending on July 1st 2016 and the injected (burst, start) pairs."""
+    return generate_corpus(600, 200, 60, bursts=2, burst_rate=0.5, end=datetime(2016, 7, 1))
+
+
+@pytest.fixture()
+def cluster(corpus):
+    """In-process Elasticsearch stand-in holding the corpus in the trends index."""
+    cluster = FakeCluster()
+    cluster.add_index(TRENDS_INDEX, corpus[0])
+    return cluster
+
+
+@pytest.fixture()
+def connections(cluster):
+    """Shared connections component counting requests to the stand-in."""
+    return ElasticsearchConnections(None, connection_class=FakeConnection, cluster=cluster)
+
+
+@pytest.fixture()
+def redis():
+    """In-process Redis stand-in."""
+    return FakeRedis()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Backtest tests."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from invenio_trends.analysis.backtest import Backtest
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.local_backend import day_index
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.cli import backtest
+from invenio_trends.config import TRENDS_PARAMS
+
+parameters = {
+    'foreground_window': 5,
+    'background_window': 60,
+    'minimum_frequency_threshold': 3,
+    'smoothing_len': 3,
+    'num_cluster': 2,
+    'num_trends': 3,
+}
+
+
+@pytest.fixture
+def snapshot(export_snapshot):
+    """Random documents where term 'burst' appears after a given day."""
+    first, last = day_index(datetime(2016, 4, 1)), day_index(datetime(2016, 7, 1))
+    burst = day_index(datetime(2016, 6, 25))
+    days = {}
+    for day in range(first, last):
+        random = np.random.RandomState(day)
+        days[day] = [['topic %d' % j for j in random.choice(30, 5, replace=False)] +
+                     (['burst'] if day >= burst and random.rand() < 0.5 else []) for i in range(10)]
+    return export_snapshot(days, datetime(2016, 4, 1), datetime(2016, 7, 1))
+
+
+def test_backtest(snapshot):
+    detector = TrendsDetector(TRENDS_PARAMS, backend=snapshot)
+    expected = []
+    for day in range(5):
+        reference_date = datetime(2016, 6, 26) + timedelta(days=day)
+        trends = detector.run_pipeline(reference_date=reference_date, granularity=Granularity.day, **parameters)
+        expected.extend((reference_date, term) for term, stats, hist in trends)
+
+    rows = list(Backtest(TrendsDetector(TRENDS_PARAMS, backend=snapshot), snapshot).run(
+        datetime(2016, 6, 26), datetime(2016, 6, 30), **parameters))
+    assert [(date, term) for date, term, score in rows] == expected
+    assert (datetime(2016, 6, 30), 'burst') in expected
+
+
+def test_backtest_command(snapshot):
+    res = CliRunner().invoke(backtest, ['--start', '2016-06-29', '--end', '2016-06-30', '--snapshot', snapshot.path,
+                                        '--foreground-window', '5', '--background-window', '60'])
+    assert res.exit_code == 0
+    lines = res.output.splitlines()
+    assert lines[0] == 'date,term,score'
+    assert any(line.startswith('2016-06-30,burst,') for line in lines)
+
+    res = CliRunner().invoke(backtest, ['--start', 'yesterday', '--end', '2016-06-30', '--snapshot', snapshot.path])
+    assert res.exit_code != 0
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Binning tests."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from invenio_trends.analysis.binning import bin_date, bin_dates, bin_index, bin_indices, floor_date, rebin
+from invenio_trends.analysis.granularity import Granularity
+
+
+def test_floor_date():
+    date = datetime(2016, 7, 14, 13, 30)
+    assert floor_date(date, Granularity.year) == datetime(2016, 1, 1)
+    assert floor_date(date, Granularity.month) == datetime(2016, 7, 1)
+    assert floor_date(date, Granularity.week) == datetime(2016, 7, 11)
+    assert floor_date(date, Granularity.day) == datetime(2016, 7, 14)
+    assert floor_date(date, Granularity.hour) == datetime(2016, 7, 14, 13)
+
+
+def test_bin_index():
+    dates = [datetime(1969, 12, 31, 23), datetime(2016, 2, 29, 12), datetime(2016, 12, 31, 23, 59)]
+    for granularity in Granularity:
+        indices = bin_indices(dates, granularity)
+        for date, index, start in zip(dates, indices, bin_dates(indices, granularity)):
+            assert bin_index(date, granularity) == index
+            assert bin_date(index, granularity) == start
+            assert start <= date < bin_date(index + 1, granularity)
+    assert bin_index(datetime(1970, 1, 1), Granularity.week) == 0
+    assert bin_index(datetime(1970, 1, 5), Granularity.week) == 1
+    months = bin_indices([datetime(2015, 12, 31), datetime(2016, 2, 1)], Granularity.month)
+    assert months[1] - months[0] == 2
+
+
+def test_rebin():
+    origin = bin_index(datetime(2016, 1, 28), Granularity.day)
+    x, y = rebin(origin, np.arange(10), Granularity.day, Granularity.month)
+    assert bin_date(x, Granularity.month) == datetime(2016, 1, 1)
+    assert np.array_equal(y, [0 + 1 + 2 + 3, 4 + 5 + 6 + 7 + 8 + 9])
+
+    x, y = rebin(origin, np.vstack([np.ones(10), np.arange(10)]), Granularity.day, Granularity.week)
+    assert bin_date(x, Granularity.week) == datetime(2016, 1, 25)
+    assert np.array_equal(y, [[4, 6], [0 + 1 + 2 + 3, 4 + 5 + 6 + 7 + 8 + 9]])
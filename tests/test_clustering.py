@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Clustering tests."""
+
+import numpy as np
+import pytest
+
+from invenio_trends.analysis.clustering import fit_predict, score_features, trending_cluster
+
+rising = np.array([[0, 1, 2, 3], [0, 1, 2, 4], [0, 1, 3, 4]], dtype=float)
+flat = np.array([[1, 1, 1, 1], [1, 1, 0, 1], [0, 0, 0, 0], [0, 0, 1, 0]], dtype=float)
+values = np.vstack([rising, flat])
+
+
+def test_score_features():
+    assert score_features(values, 'series') is values
+    summary = score_features(values, 'summary')
+    assert summary.shape == (7, 3)
+    assert np.allclose(summary[0], [1, 1, 3])
+    with pytest.raises(ValueError):
+        score_features(values, 'unknown')
+
+
+@pytest.mark.parametrize('algorithm', ['kmeans', 'minibatch', 'auto'])
+@pytest.mark.parametrize('features', ['series', 'summary'])
+def test_fit_predict(algorithm, features):
+    feats = score_features(values, features)
+    labels, centers = fit_predict(feats, 2, algorithm, 5, 0)
+    assert np.array_equal(labels, fit_predict(feats, 2, algorithm, 5, 0)[0])
+    trending = labels == trending_cluster(centers, features)
+    assert np.array_equal(trending, [True] * 3 + [False] * 4)
+
+
+def test_fit_predict_warm_start():
+    labels, centers = fit_predict(values, 2, 'kmeans', 5, 0)
+    warm_labels, warm_centers = fit_predict(values, 2, 'kmeans', 5, 0, init=centers)
+    assert np.array_equal(labels, warm_labels)
+    assert np.allclose(centers, warm_centers)
+    assert fit_predict(values, 2, 'kmeans', 5, 0, init=np.zeros((3, 4)))[1].shape == (2, 4)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Connections tests."""
+
+import pytest
+from elasticsearch import Connection, ConnectionTimeout
+
+from invenio_trends.connections import ElasticsearchConnections, without_retries
+
+
+def test_connections():
+    connections = ElasticsearchConnections(['es1:9200', 'es2:9200', 'es3:9200'], maxsize=4, timeout=5, compress=True)
+    pool = connections.client.transport.connection_pool
+    assert len(pool.connections) == 3
+    hosts = [pool.get_connection().host for i in range(6)]
+    assert sorted(hosts[:3]) == ['http://es1:9200', 'http://es2:9200', 'http://es3:9200']
+    assert hosts[3:] == hosts[:3]
+    for connection in pool.connections:
+        assert connection.counter is connections.requests
+        assert connection.timeout == 5
+        assert connection.pool.pool.maxsize == 4
+        assert 'gzip' in connection.headers['accept-encoding']
+
+    connection = ElasticsearchConnections(['es1:9200']).client.transport.connection_pool.connections[0]
+    assert 'accept-encoding' not in connection.headers
+
+
+class TimingOutConnection(Connection):
+    """Connection counting its requests, all timing out."""
+
+    def __init__(self, attempts=None, **kwargs):
+        """Set up a connection appending its requests to attempts."""
+        super(TimingOutConnection, self).__init__(**kwargs)
+        self.attempts = attempts
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        """Time out."""
+        self.attempts.append((self.host, url, timeout))
+        raise ConnectionTimeout('TIMEOUT', 'timed out', None)
+
+
+def test_without_retries():
+    attempts = []
+    client = ElasticsearchConnections(['es1:9200', 'es2:9200'], connection_class=TimingOutConnection,
+                                      attempts=attempts, max_retries=3, retry_on_timeout=True, timeout=5).client
+    with pytest.raises(ConnectionTimeout):
+        client.reindex(body={})
+    assert len(attempts) == 4
+
+    del attempts[:]
+    with pytest.raises(ConnectionTimeout):
+        without_retries(client).reindex(body={}, request_timeout=60)
+    assert len(attempts) == 1
+    assert attempts[0][1:] == ('/_reindex', 60)
+    assert client.transport.max_retries == 3
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Downsampling tests."""
+
+import numpy as np
+
+from invenio_trends.analysis.downsampling import lttb
+
+
+def test_lttb():
+    y = np.zeros(1000)
+    y[333], y[700] = 10, -5
+    kept = lttb(y, 20)
+    assert len(kept) == 20
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 333 in kept and 700 in kept
+
+
+def test_lttb_short():
+    assert np.array_equal(lttb(np.arange(5), 10), np.arange(5))
+    assert np.array_equal(lttb(np.arange(5), None), np.arange(5))
+    assert np.array_equal(lttb(np.arange(5), 3)[[0, -1]], [0, 4])
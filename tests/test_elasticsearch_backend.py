@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Elasticsearch backend tests."""
+
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from invenio_trends.analysis.binning import bin_index
+from invenio_trends.analysis.elasticsearch_backend import ElasticsearchBackend
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.term_vectors_cache import TermVectorsCache
+from invenio_trends.config import TRENDS_PARAMS
+
+start, end = datetime(2016, 5, 15), datetime(2016, 7, 1)
+
+
+@pytest.fixture()
+def backend(connections):
+    return ElasticsearchBackend(TRENDS_PARAMS, connections.client, request_counter=connections.requests)
+
+
+def expected_histogram(corpus, term, start, end, granularity):
+    counts = Counter(bin_index(date, granularity) for id, date, terms in corpus
+                     if start < date <= end and (term is None or term in terms))
+    if not counts:
+        return 0, []
+    origin = min(counts)
+    return origin, [counts[index] for index in range(origin, max(counts) + 1)]
+
+
+def test_date_histograms(backend, corpus):
+    terms = [None, 'topic 0', 'burst 0', 'burst 1', 'topic 150', 'unknown']
+    # entries after start until end, the bins containing them being partially counted
+    bounds = [(Granularity.day, start, end), (Granularity.week, datetime(2016, 5, 18, 15), datetime(2016, 6, 29))]
+    for granularity, hist_start, hist_end in bounds:
+        requests, size = backend.requests.snapshot()
+        hists = backend.date_histograms(hist_start, hist_end, granularity, terms, batch_size=4)
+        assert backend.requests.snapshot()[0] - requests == 2
+        for term, (origin, y) in zip(terms, hists):
+            expected_origin, expected_y = expected_histogram(corpus[0], term, hist_start, hist_end, granularity)
+            assert y.dtype == np.int64
+            assert np.array_equal(y, expected_y)
+            if len(y):
+                assert origin == expected_origin
+
+    burst, burst_start = corpus[1][0]
+    origin, y = backend.date_histograms(start, end, Granularity.day, [burst])[0]
+    assert origin >= bin_index(burst_start, Granularity.day)
+    assert y[0] > 0 and y[-1] > 0
+
+
+def test_parse_histogram(backend):
+    class Bucket:
+        def __init__(self, date, doc_count):
+            self.key = (np.datetime64(date, 'ms') - np.datetime64(0, 'ms')).astype(np.int64)
+            self.doc_count = doc_count
+
+    origin, y = backend.parse_histogram([Bucket('2016-02-01', 3), Bucket('2016-04-01', 5)], Granularity.month)
+    assert origin == bin_index(datetime(2016, 2, 1), Granularity.month)
+    assert np.array_equal(y, [3, 0, 5])
+    origin, y = backend.parse_histogram([], Granularity.month)
+    assert len(y) == 0
+
+
+def test_term_statistics(backend, corpus):
+    ids = backend.interval_ids(start, end)
+    assert len(ids) == sum(1 for id, date, terms in corpus[0] if start < date <= end)
+
+    requests, size = backend.requests.snapshot()
+    words = backend.term_statistics(ids, chunk=7, concurrency=3)
+    assert backend.requests.snapshot()[0] - requests == -(-len(ids) // 7)
+    assert words.documents == len(ids)
+
+    # chunks are folded in request order whatever the order they complete in
+    sequential = backend.term_statistics(ids, chunk=len(ids), concurrency=1)
+    assert words.terms == sequential.terms
+    assert list(words.doc_freq) == list(sequential.doc_freq)
+    assert list(words.term_freq) == list(sequential.term_freq)
+
+    documents = dict((id, terms) for id, date, terms in corpus[0])
+    assert words['topic 0']['doc_freq'] == sum(1 for id in ids if 'topic 0' in documents[id])
+    assert words['topic 0']['term_freq'] == sum(documents[id]['topic 0'] for id in ids)
+
+    assert len(backend.term_statistics([])) == 0
+    with pytest.raises(AssertionError):
+        backend.term_statistics(ids[:5] + ['missing'])
+
+
+def test_term_statistics_cached(tmpdir, connections):
+    cache = TermVectorsCache(str(tmpdir.join('vectors.db')), {'analyzer': 1}, chunk=7)
+    backend = ElasticsearchBackend(TRENDS_PARAMS, connections.client, vectors_cache=cache,
+                                   request_counter=connections.requests)
+    ids = backend.interval_ids(start, end)
+    fetched = backend.term_statistics(ids[:20], chunk=10)
+    assert cache.cached_ids(ids) == set(ids[:20])
+
+    # estimates of the first fetch are stale once the corpus grew, they give way to the ones fetched now
+    id, vector = next(cache.get_many(ids[:1]))
+    cache.put_many([(id, dict((term, dict(freqs, doc_freq=1)) for term, freqs in vector.items()))])
+    requests, size = backend.requests.snapshot()
+    words = backend.term_statistics(ids, chunk=10)
+    assert backend.requests.snapshot()[0] - requests == -(-(len(ids) - 20) // 10)
+    assert words.documents == len(ids)
+    expected = ElasticsearchBackend(TRENDS_PARAMS, connections.client).term_statistics(ids)
+    assert dict(words.items()) == dict(expected.items())
+    assert fetched['topic 0']['doc_total'] == words['topic 0']['doc_total']
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Embedding index tests."""
+
+import io
+import os
+
+import numpy as np
+
+from invenio_trends.embedding_index import EmbeddingIndex
+
+
+def test_expand(tmpdir):
+    source = os.path.join(str(tmpdir), 'vectors.txt')
+    with io.open(source, 'w', encoding='utf-8') as f:
+        f.write(u'6 2\n')
+        f.write(u'dark-matter 1 0\n')
+        f.write(u'axion 0.9 0.1\n')
+        f.write(u'wimp 2 0.5\n')
+        f.write(u'cold-dark-matter 1 0.05\n')
+        f.write(u'higgs 0 1\n')
+        f.write(u'broken 1\n')
+    path = os.path.join(str(tmpdir), 'index')
+    EmbeddingIndex.build(path, source)
+
+    index = EmbeddingIndex(path, 0.7, 2)
+    assert index.words == ['dark-matter', 'axion', 'wimp', 'cold-dark-matter', 'higgs']
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1)
+    assert index.expand(['dark matter', 'higgs', 'unknown']) == {
+        'dark matter': ['cold dark matter', 'axion'],
+        'higgs': [],
+        'unknown': [],
+    }
+    assert index.submit(['axion'])['axion'].result() == ['cold dark matter', 'dark matter']
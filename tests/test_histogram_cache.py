@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Histogram cache tests."""
+
+from datetime import datetime
+
+import numpy as np
+
+from invenio_trends.analysis.elasticsearch_backend import ElasticsearchBackend
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.histogram_cache import HistogramCache
+from invenio_trends.config import TRENDS_PARAMS
+
+cache = HistogramCache(None, 'invenio:trends:test', 60)
+
+
+def test_encode_decode():
+    origin, y = cache.decode(cache.encode((16801, np.array([3, 0, 5]))))
+    assert origin == 16801
+    assert np.array_equal(y, [3, 0, 5])
+
+
+def test_encode_decode_empty():
+    origin, y = cache.decode(cache.encode((0, np.array([]))))
+    assert len(y) == 0
+
+
+def test_invalidate(redis):
+    cache = HistogramCache(redis, 'invenio:trends:test', 60)
+    keys = cache.keys('index', [None, 'higgs'], datetime(2016, 1, 1), None, Granularity.day)
+    assert len(set(keys)) == 2
+    assert cache.keys('index', [None, 'higgs'], datetime(2016, 1, 1), None, Granularity.day) == keys
+    cache.set_many(keys, [(1, np.array([1])), (2, np.array([2]))])
+    assert cache.get_many(keys)[1][0] == 2
+
+    cache.invalidate()
+    renewed = cache.keys('index', [None, 'higgs'], datetime(2016, 1, 1), None, Granularity.day)
+    assert not set(renewed) & set(keys)
+    assert cache.get_many(renewed) == [None, None]
+
+
+def test_cached_date_histograms(redis, connections):
+    cache = HistogramCache(redis, 'invenio:trends:test', 60)
+    backend = ElasticsearchBackend(TRENDS_PARAMS, connections.client, histogram_cache=cache,
+                                   request_counter=connections.requests)
+    terms = [None, 'topic 0', 'topic 1']
+    start, end = datetime(2016, 6, 1, 9), datetime(2016, 6, 30, 9)
+
+    def fetch(start, end, terms):
+        requests, size = backend.requests.snapshot()
+        hists = backend.date_histograms(start, end, Granularity.day, terms)
+        return hists, backend.requests.snapshot()[0] - requests
+
+    hists, requests = fetch(start, end, terms)
+    assert requests == 1
+    # the same bounds hit the cache, only missing terms are fetched
+    cached, requests = fetch(start, end, terms + ['topic 2'])
+    assert requests == 1
+    assert all(np.array_equal(a[1], b[1]) and a[0] == b[0] for a, b in zip(hists, cached))
+    assert fetch(start, end, terms + ['topic 2'])[1] == 0
+    # other bounds are keyed apart
+    assert fetch(start, datetime(2016, 6, 30, 23), terms)[1] == 1
+
+    cache.invalidate()
+    assert fetch(start, end, terms)[1] == 1
+
+    # an unavailable cache falls back to elasticsearch
+    redis.down = True
+    unavailable, requests = fetch(start, end, terms)
+    assert requests == 1
+    assert all(np.array_equal(a[1], b[1]) for a, b in zip(hists, unavailable))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Instrumentation tests."""
+
+from invenio_trends.analysis.instrumentation import PipelineReport, RequestCounter
+
+
+def test_report():
+    counter = RequestCounter()
+    report = PipelineReport(counter)
+
+    def stage(items):
+        counter.add(10)
+        counter.add(5)
+        return items[:2]
+
+    assert report.measure('first', 3, stage, [1, 2, 3]) == [1, 2]
+    report.measure('second', None, list)
+
+    res = report.to_dict()
+    assert res['requests'] == 2
+    assert res['bytes'] == 15
+    first, second = res['stages']
+    assert first['stage'] == 'first'
+    assert first['requests'] == 2
+    assert first['bytes'] == 15
+    assert first['items_in'] == 3
+    assert first['items_out'] == 2
+    assert first['time'] >= 0
+    assert second['requests'] == 0
+    assert second['items_out'] == 0
@@ -41,6 +41,7 @@ def test_init():
     app = Flask('testapp')
     InvenioTrends(app)
     assert 'invenio-trends' in app.extensions
+    assert app.extensions['invenio-trends'].elasticsearch.client is not None
 
     app = Flask('testapp')
     ext = InvenioTrends()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Local backend tests."""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from invenio_trends.analysis.backend import Backend
+from invenio_trends.analysis.binning import bin_date
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.local_backend import day_date, day_index
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.config import TRENDS_PARAMS
+
+
+@pytest.fixture
+def snapshot(export_snapshot):
+    origin = day_index(datetime(2016, 7, 1))
+    return export_snapshot({
+        origin: [['higgs', 'dark matter'], ['higgs']],
+        origin + 1: [['axion']],
+        origin + 3: [['higgs', 'axion'], ['axion'], ['dark matter']],
+    }, day_date(origin), day_date(origin + 4))
+
+
+def test_ids(snapshot):
+    origin = snapshot.origin
+    assert snapshot.interval_ids(datetime(2016, 6, 1), datetime(2016, 7, 2)) == [origin, origin + 1]
+    assert snapshot.interval_ids(datetime(2016, 7, 1), datetime(2016, 8, 1)) == [origin + 1, origin + 2, origin + 3]
+    assert snapshot.bin_ids(datetime(2016, 7, 1), datetime(2016, 7, 2)) == [origin]
+    assert snapshot.bin_ids(datetime(2016, 7, 1, 12), datetime(2016, 7, 3, 12)) == [origin + 1, origin + 2]
+
+
+def test_term_statistics(snapshot):
+    words = snapshot.term_statistics(snapshot.interval_ids(datetime(2016, 7, 1), datetime(2016, 7, 4)))
+    assert words.documents == 4
+    assert sorted(words.terms) == ['axion', 'dark matter', 'higgs']
+    assert words['axion'] == {'term_total': 10, 'doc_total': 5, 'term_freq': 3, 'doc_freq': 3}
+    assert len(snapshot.term_statistics([])) == 0
+
+
+def test_date_histograms(snapshot):
+    reference, higgs, missing = snapshot.date_histograms(None, None, Granularity.day, [None, 'higgs', 'muon'])
+    assert reference[0] == day_index(datetime(2016, 7, 1))
+    assert np.array_equal(reference[1], [2, 1, 0, 3])
+    assert np.array_equal(higgs[1], [2, 0, 0, 1])
+    assert len(missing[1]) == 0
+
+    axion, = snapshot.date_histograms(datetime(2016, 7, 1), datetime(2016, 7, 3), Granularity.day, ['axion'])
+    assert axion[0] == day_index(datetime(2016, 7, 2))
+    assert np.array_equal(axion[1], [1])
+
+    with pytest.raises(ValueError):
+        snapshot.date_histograms(None, None, Granularity.week, ['axion'])
+
+
+def test_multi_pipeline(snapshot):
+    detector = TrendsDetector(TRENDS_PARAMS, backend=snapshot, base_granularity=Granularity.day)
+    weeks = detector.date_histograms(None, None, Granularity.week, [None, 'axion'])
+    assert bin_date(weeks[0][0], Granularity.week) == datetime(2016, 6, 27)
+    assert np.array_equal(weeks[0][1], [3, 3])
+    assert np.array_equal(weeks[1][1], [1, 2])
+
+    windows = {Granularity.day: (2, 4, 1), Granularity.week: (1, 2, 1)}
+    trends = detector.run_multi_pipeline(datetime(2016, 7, 4), windows, 1, 1, 2)
+    assert set(trends) == set(windows)
+    assert [term for term, stats, hist in trends[Granularity.day]] == ['axion', 'dark matter']
+    assert [term for term, stats, hist in trends[Granularity.week]] == ['axion', 'higgs']
+
+
+def test_backend_interface(snapshot):
+    assert isinstance(snapshot, Backend)
+    with pytest.raises(TypeError):
+        type('PartialBackend', (Backend,), {'bin_ids': snapshot.bin_ids, 'term_statistics': snapshot.term_statistics})()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Payloads tests."""
+
+import json
+from datetime import datetime
+
+import numpy as np
+
+from invenio_trends.analysis.binning import bin_index
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.payloads import COLUMNAR_MIMETYPE, JSON_MIMETYPE, MSGPACK_MIMETYPE, PayloadCache, \
+    search_payload, serialize
+
+
+def test_search_payload():
+    origin = bin_index(datetime(2016, 1, 4), Granularity.week)
+    payload = search_payload([('a', (origin, np.array([1, 0, 4]))), ('b', (0, np.array([], dtype=np.int64)))],
+                             datetime(2016, 1, 1), datetime(2016, 2, 1), Granularity.week, {'a': [], 'b': []})
+    assert payload['stats'] == {'minValue': 0, 'maxValue': 4, 'minDate': '2016-01-04T00:00:00',
+                                'maxDate': '2016-01-18T00:00:00'}
+    assert payload['data'][0]['series'][1] == {'date': '2016-01-11T00:00:00', 'value': 0}
+    assert payload['data'][1] == {'name': 'b', 'series': []}
+
+
+def test_payload_cache_encode_decode():
+    payloads = {JSON_MIMETYPE: {'data': [{'name': 'a', 'series': []}]},
+                COLUMNAR_MIMETYPE: {'data': [{'name': 'a', 'dates': [], 'values': []}]}}
+    for compress, encoding in ((False, 'identity'), (True, 'gzip')):
+        cache = PayloadCache(None, 'invenio:trends:test', compress)
+        mapping = cache.encode(payloads, timestamp=1.5)
+        for mimetype, payload in payloads.items():
+            stored = [mapping[field] if isinstance(mapping[field], bytes) else str(mapping[field]).encode('utf-8')
+                      for field in cache.fields(mimetype)]
+            body, stored_encoding, etag, timestamp = cache.decode(stored)
+            assert stored_encoding == encoding
+            assert timestamp == 1.5
+            assert json.loads(PayloadCache.decompress(body, encoding).decode('utf-8')) == payload
+
+            assert cache.decode([None] * len(stored)) is None
+            assert cache.decode(stored[:-1] + [b'0']) is None
+
+
+def test_search_payload_layouts():
+    origin = bin_index(datetime(2016, 1, 4), Granularity.week)
+    hists = [('a', (origin, np.array([1, 0, 4])))]
+    columnar = search_payload(hists, granularity=Granularity.week, mimetype=COLUMNAR_MIMETYPE)
+    dates = ['2016-01-04T00:00:00', '2016-01-11T00:00:00', '2016-01-18T00:00:00']
+    assert columnar['data'] == [{'name': 'a', 'dates': dates, 'values': [1, 0, 4]}]
+    assert columnar['stats'] == search_payload(hists, granularity=Granularity.week)['stats']
+
+    binary = search_payload(hists, granularity=Granularity.week, mimetype=MSGPACK_MIMETYPE)['data'][0]
+    dates = np.frombuffer(binary['dates'], dtype='<f8').astype(np.int64).astype('datetime64[ms]')
+    assert dates[0] == np.datetime64('2016-01-04')
+    assert np.array_equal(np.frombuffer(binary['values'], dtype='<f8'), [1, 0, 4])
+    assert json.loads(serialize(columnar).decode('utf-8')) == columnar
+
+
+def test_search_payload_max_points():
+    origin = bin_index(datetime(2016, 1, 1), Granularity.day)
+    values = np.zeros(365, dtype=np.int64)
+    values[100] = 9
+    payload = search_payload([('a', (origin, values))], granularity=Granularity.day, max_points=30)
+    series = payload['data'][0]['series']
+    assert len(series) == 30
+    assert {'date': '2016-04-10T00:00:00', 'value': 9} in series
+    assert payload['stats'] == {'minValue': 0, 'maxValue': 9, 'minDate': '2016-01-01T00:00:00',
+                                'maxDate': '2016-12-30T00:00:00'}
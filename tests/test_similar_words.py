@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Similar words tests."""
+
+import time
+
+from invenio_trends.similar_words import SimilarWords
+
+
+def test_select():
+    similar = SimilarWords('http://localhost', 0.2, 0.7, 2)
+    vector = [['dark-matter', 0.8], ['axion', 0.9], ['matter', 0.95], ['wimp', 0.5], ['neutralino', 0.75]]
+    assert similar.select('matter', vector) == ['axion', 'neutralino']
+
+
+def test_local_cache():
+    similar = SimilarWords('http://localhost', 0.2, 0.7, 2, cache_size=2)
+    similar.set_local('a', ['b'], None)
+    similar.set_local('c', [], -1)
+    assert similar.get_local('a') == ['b']
+    assert similar.get_local('c') is None
+    similar.set_local('d', ['e'], 60)
+    similar.set_local('f', ['g'], 60)
+    assert similar.get_local('a') is None
+    assert similar.expand(['d', 'f']) == {'d': ['e'], 'f': ['g']}
+
+
+def test_negative_cache():
+    similar = SimilarWords('http://127.0.0.1:9', 0.2, 0.7, 2, negative_ttl=60)
+    assert similar.expand(['higgs', 'axion']) == {'higgs': [], 'axion': []}
+    assert similar.local['higgs'][0] > time.time()
+    assert similar.submit(['higgs'])['higgs'].done()
+
+
+def test_redis_cache(redis):
+    similar = SimilarWords('http://127.0.0.1:9', 0.2, 0.7, 2, redis, 'invenio:trends:test', ttl=3600, negative_ttl=60)
+    redis.setex('invenio:trends:test:axion', 3600, '["wimp"]')
+    assert similar.expand(['higgs', 'axion']) == {'higgs': [], 'axion': ['wimp']}
+    assert similar.local['axion'][0] > time.time() + 3000
+
+    # another worker keeps a failure only as long as redis does
+    other = SimilarWords('http://127.0.0.1:9', 0.2, 0.7, 2, redis, 'invenio:trends:test', ttl=3600, negative_ttl=60)
+    assert other.expand(['higgs']) == {'higgs': []}
+    assert other.local['higgs'][0] <= time.time() + 60
+
+
+def test_redis_unavailable(redis):
+    redis.down = True
+    similar = SimilarWords('http://127.0.0.1:9', 0.2, 0.7, 2, redis, 'invenio:trends:test', ttl=3600, negative_ttl=60)
+    assert similar.expand(['higgs']) == {'higgs': []}
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Single flight tests."""
+
+import threading
+import time
+
+import pytest
+
+from invenio_trends.single_flight import SingleFlight
+
+
+def test_coalescing():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return b'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(['a', None], compute))) for i in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b'result'] * 8
+    assert len(calls) == 1
+    assert not flight.flights
+
+    assert flight.do(['a', None], compute) == b'result'
+    assert len(calls) == 2
+    assert flight.do(['b'], lambda: b'other') == b'other'
+
+
+def test_coalescing_error():
+    flight = SingleFlight()
+
+    def compute():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        flight.do(['a'], compute)
+    assert not flight.flights
+
+
+def test_coalescing_processes(redis):
+    flights = [SingleFlight(redis, 'flight', lock_timeout=5, poll_interval=0.01) for i in range(4)]
+    calls = []
+    started = threading.Event()
+    finish = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        finish.wait()
+        return b'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda flight=flight: results.append(flight.do(['a'], compute)))
+               for flight in flights]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    finish.set()
+    for thread in threads:
+        thread.join()
+    assert results == [b'result'] * 4
+    assert len(calls) == 1
+    assert not redis.exists('flight:%s:lock' % flights[0].key(['a']))
+
+
+def test_coalescing_processes_error(redis):
+    leader, follower = [SingleFlight(redis, 'flight', lock_timeout=5, poll_interval=0.01) for i in range(2)]
+    started = threading.Event()
+    fail = threading.Event()
+
+    def failing():
+        started.set()
+        fail.wait()
+        raise ValueError('failed')
+
+    errors = []
+
+    def lead():
+        try:
+            leader.do(['a'], failing)
+        except ValueError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    started.wait()
+    threading.Timer(0.1, fail.set).start()
+    begin = time.time()
+    assert follower.do(['a'], lambda: b'result') == b'result'
+    assert time.time() - begin < 1
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_coalescing_redis_unavailable(redis):
+    flight = SingleFlight(redis, 'flight')
+    redis.down = True
+    assert flight.do(['a'], lambda: b'result') == b'result'
+    assert not flight.flights
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Tasks tests."""
+
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from invenio_trends import InvenioTrends, tasks
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.term_vectors_cache import TermVectorsCache
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.config import TRENDS_EMERGING_REDIS_KEY, TRENDS_PARAMS, TRENDS_REDIS_KEY, \
+    TRENDS_REPORT_REDIS_KEY
+from invenio_trends.etl.index_synchronizer import IndexSynchronizer
+from invenio_trends.payloads import PayloadCache
+from invenio_trends.utils import granularity_key
+
+reference_date = datetime(2016, 7, 1, 12)
+windows = {Granularity.day: (10, 40, 3), Granularity.week: (2, 8, 1)}
+
+
+class ReferenceDatetime(datetime):
+    """Datetime whose now is the reference date."""
+
+    @classmethod
+    def now(cls):
+        return reference_date
+
+
+@pytest.fixture()
+def task_redis(redis, monkeypatch):
+    monkeypatch.setattr(tasks, 'redis', redis)
+    monkeypatch.setattr(tasks, 'emerging_cache', PayloadCache(redis, TRENDS_EMERGING_REDIS_KEY, True))
+    return redis
+
+
+def emerging(granularity):
+    body, encoding, etag, timestamp = tasks.emerging_cache.load(granularity)
+    return json.loads(PayloadCache.decompress(body, encoding).decode('utf-8'))
+
+
+def test_publish_trends(task_redis, connections):
+    td = TrendsDetector(TRENDS_PARAMS, client=connections.client, request_counter=connections.requests)
+    trends = td.run_multi_pipeline(reference_date, windows, 3, 2, 5)
+    for granularity, detected in trends.items():
+        assert len(detected)
+        # histograms are fetched only when the detector does not hold them
+        tasks.publish_trends(TrendsDetector(TRENDS_PARAMS, client=connections.client), granularity, detected,
+                             reference_date)
+        fetched = emerging(granularity)
+        requests, size = connections.requests.snapshot()
+        tasks.publish_trends(td, granularity, detected, reference_date)
+        assert connections.requests.snapshot()[0] == requests
+        assert emerging(granularity) == fetched
+        terms, end = task_redis.hmget(granularity_key(TRENDS_REDIS_KEY, granularity), 'terms', 'end')
+        assert terms.decode('utf-8').split(',') == [term for term, stats, hist in detected]
+        assert end == b'2016-07-01T12:00:00'
+        # series run from the first foreground bin until the reference date, the last bins included
+        first = min(date for term, stats, (dates, score) in detected for date in dates).astype(object)
+        for data in emerging(granularity)['data']:
+            assert len(data['series'])
+            assert data['series'][0]['date'] >= first.isoformat()
+        assert emerging(granularity)['stats']['maxDate'] >= '2016-06-27'
+
+
+def test_multi_pipeline_short_granularity(connections):
+    td = TrendsDetector(TRENDS_PARAMS, client=connections.client, request_counter=connections.requests)
+    # the corpus spans two months, too few to smooth monthly histograms over three bins
+    short = dict(windows)
+    short[Granularity.month] = (2, 24, 3)
+    trends = td.run_multi_pipeline(reference_date, short, 3, 2, 5)
+    assert trends[Granularity.month] == []
+    assert len(trends[Granularity.day]) and len(trends[Granularity.week])
+
+
+def test_update_trends_cube(app, tmpdir, task_redis, connections, monkeypatch):
+    InvenioTrends(app).elasticsearch = connections
+    monkeypatch.setattr(tasks, 'datetime', ReferenceDatetime)
+    monkeypatch.setattr(tasks, 'TRENDS_CUBE_PATH', str(tmpdir))
+    monkeypatch.setattr(tasks, 'TRENDS_PUBLISHED_GRANULARITIES', windows)
+    monkeypatch.setattr(tasks, 'TRENDS_MINIMUM_FREQUENCY_THRESHOLD', 3)
+    monkeypatch.setattr(tasks, 'TRENDS_NUM_CLUSTER', 2)
+    with app.app_context():
+        tasks.update_trends()
+
+    # the cube computes day trends, the other published granularities are still refreshed
+    for granularity in windows:
+        assert task_redis.hmget(granularity_key(TRENDS_REDIS_KEY, granularity), 'terms')[0]
+        assert emerging(granularity)['data']
+    stages = [stage['stage'] for stage in json.loads(task_redis.get(TRENDS_REPORT_REDIS_KEY))['stages']]
+    assert stages[0] == 'update_cube'
+    assert 'date_histograms' in stages
+
+
+def test_update_trends_vectors_cache(app, tmpdir, task_redis, connections, monkeypatch):
+    InvenioTrends(app).elasticsearch = connections
+    path = str(tmpdir.join('vectors.db'))
+    cache = TermVectorsCache(path, IndexSynchronizer(TRENDS_PARAMS, connections.client).analyzer_config())
+    cache.put_many([('stale', {}), ('recent', {})])
+    # seen before the widest background window, and within it but before the day one
+    for id, days in [('stale', 60), ('recent', 50)]:
+        with cache.connection:
+            cache.connection.execute('UPDATE vectors SET seen = ? WHERE id = ?', (time.time() - days * 86400, id))
+    monkeypatch.setattr(tasks, 'datetime', ReferenceDatetime)
+    monkeypatch.setattr(tasks, 'TRENDS_VECTORS_CACHE_PATH', path)
+    monkeypatch.setattr(tasks, 'TRENDS_PUBLISHED_GRANULARITIES', windows)
+    monkeypatch.setattr(tasks, 'TRENDS_MINIMUM_FREQUENCY_THRESHOLD', 3)
+    monkeypatch.setattr(tasks, 'TRENDS_NUM_CLUSTER', 2)
+    with app.app_context():
+        tasks.update_trends()
+
+    assert cache.cached_ids(['stale', 'recent']) == set(['recent'])
+    assert len(cache.cached_ids([str(id) for id in range(600)])) > 0
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Term cube tests."""
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.term_cube import TermCube
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.config import TRENDS_PARAMS
+
+
+def test_bin_index(tmpdir):
+    cube = TermCube(str(tmpdir), Granularity.day)
+    index = cube.bin_index(datetime(2016, 7, 1, 13, 30))
+    assert cube.bin_date(index) == datetime(2016, 7, 1)
+    assert cube.bin_index(datetime(2016, 7, 2)) == index + 1
+
+    with pytest.raises(ValueError):
+        TermCube(str(tmpdir), Granularity.month)
+
+
+def test_cube(tmpdir, statistics):
+    cube = TermCube(str(tmpdir), Granularity.day)
+    assert cube.watermark is None
+    cube.add_bin(10, statistics(['higgs', 'dark matter'], ['higgs']))
+    cube.add_bin(11, statistics(['axion']))
+    cube.add_bin(12, statistics(['higgs', 'axion'], ['axion']))
+    cube.save(12)
+
+    cube = TermCube(str(tmpdir), Granularity.day)
+    assert cube.watermark == 12
+    assert cube.bins() == [10, 11, 12]
+
+    words = cube.statistics(11, 13)
+    assert words.documents == 3
+    assert sorted(words.terms) == ['axion', 'higgs']
+    assert words['axion'] == {'term_total': 10, 'doc_total': 5, 'term_freq': 3, 'doc_freq': 3}
+
+    reference, counts = cube.histograms(['higgs', 'axion'], 9, 13)
+    assert np.array_equal(reference, [0, 2, 1, 2])
+    assert np.array_equal(counts, [[0, 2, 0, 1], [0, 0, 1, 2]])
+
+    cube.evict(11)
+    assert cube.bins() == [11, 12]
+
+
+def test_compact(tmpdir, statistics):
+    cube = TermCube(str(tmpdir), Granularity.day)
+    cube.add_bin(10, statistics(['higgs', 'dark matter'], ['neutrino']))
+    cube.save(10)
+    cube.add_bin(11, statistics(['axion', 'higgs']))
+    cube.add_bin(12, statistics(['axion'], ['muon']))
+    cube.save(12)
+
+    cube.evict(11, slack=0.5)
+    assert len(cube.terms) == 5
+    cube.evict(12, slack=0.25)
+    assert sorted(cube.terms) == ['axion', 'muon']
+    assert len(cube.term_total) == len(cube.doc_total) == 2
+    cube.add_bin(13, statistics(['quark', 'axion']))
+    cube.save(13)
+
+    cube = TermCube(str(tmpdir), Granularity.day)
+    assert sorted(cube.terms) == ['axion', 'muon', 'quark']
+    words = cube.statistics(12, 14)
+    assert words.documents == 3
+    assert words['axion'] == {'term_total': 10, 'doc_total': 5, 'term_freq': 2, 'doc_freq': 2}
+    reference, counts = cube.histograms(['axion', 'muon', 'quark'], 12, 14)
+    assert np.array_equal(reference, [2, 1])
+    assert np.array_equal(counts, [[1, 1], [1, 0], [0, 1]])
+
+
+def test_compact_interrupted(tmpdir, statistics, monkeypatch):
+    cube = TermCube(str(tmpdir), Granularity.day)
+    cube.add_bin(10, statistics(['higgs', 'dark matter'], ['neutrino']))
+    cube.add_bin(11, statistics(['axion', 'higgs']))
+    cube.add_bin(12, statistics(['axion'], ['muon']))
+    cube.save(12)
+    expected = cube.statistics(11, 13)
+
+    # crash once the first compacted bin is written
+    write_bin = TermCube.write_bin
+
+    def failing(self, index, arrays, bins_path=None):
+        write_bin(self, index, arrays, bins_path)
+        if bins_path is not None:
+            raise IOError('interrupted')
+    monkeypatch.setattr(TermCube, 'write_bin', failing)
+    with pytest.raises(IOError):
+        cube.evict(11, slack=0.25)
+    monkeypatch.undo()
+
+    cube = TermCube(str(tmpdir), Granularity.day)
+    assert cube.watermark == 12
+    assert os.listdir(str(tmpdir.join('generations'))) == ['0']
+    words = cube.statistics(11, 13)
+    assert sorted(words.terms) == sorted(expected.terms)
+    for term in expected.terms:
+        assert words[term] == expected[term]
+
+    assert cube.compact(slack=0.25)
+    assert os.listdir(str(tmpdir.join('generations'))) == ['1']
+    cube = TermCube(str(tmpdir), Granularity.day)
+    assert sorted(cube.terms) == ['axion', 'higgs', 'muon']
+    assert cube.watermark == 12
+    assert cube.statistics(11, 13)['higgs'] == expected['higgs']
+
+
+def test_cube_pipeline(tmpdir, connections, corpus):
+    detector = TrendsDetector(TRENDS_PARAMS, client=connections.client, request_counter=connections.requests)
+    cube = TermCube(str(tmpdir), Granularity.day)
+    reference_date = datetime(2016, 6, 30, 12)
+    end = cube.bin_index(reference_date) + 1
+    assert detector.update_cube(cube, end, 30) == list(range(end - 30, end))
+    assert cube.watermark == end - 1
+
+    # only the latest bins are refetched, the oldest one is evicted
+    cube = TermCube(str(tmpdir), Granularity.day)
+    assert detector.update_cube(cube, end + 1, 30) == [end - 2, end - 1, end]
+    assert cube.bins() == list(range(end - 29, end + 1))
+    assert TermCube(str(tmpdir), Granularity.day).watermark == end
+
+    start = datetime(2016, 6, 21)
+    documents = [terms for id, date, terms in corpus[0] if start <= date < datetime(2016, 7, 1)]
+    words = cube.statistics(cube.bin_index(start), end + 1)
+    assert words.documents == len(documents)
+    assert words['topic 0']['doc_freq'] == sum(1 for terms in documents if 'topic 0' in terms)
+
+    trends = detector.run_cube_pipeline(TermCube(str(tmpdir), Granularity.day), reference_date + timedelta(days=1),
+                                        foreground_window=10, background_window=30, minimum_frequency_threshold=3,
+                                        smoothing_len=3, num_cluster=2, num_trends=5)
+    assert [stage['stage'] for stage in detector.report.stages][:2] == ['update_cube', 'statistics']
+    assert detector.report.stages[0]['items_out'] == 2
+    assert set(term for term, start in corpus[1]) <= set(term for term, stats, hist in trends)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Term statistics tests."""
+
+from invenio_trends.analysis.term_statistics import TermStatistics
+
+
+def test_add():
+    words = TermStatistics()
+    words.add({
+        'dark matter': {'term_freq': 2, 'ttf': 40, 'doc_freq': 10},
+        'higgs': {'term_freq': 1, 'ttf': 30, 'doc_freq': 20},
+    })
+    words.add({
+        'dark matter': {'term_freq': 3, 'ttf': 41, 'doc_freq': 11},
+    })
+    assert words.documents == 2
+    assert len(words) == 2
+    assert 'higgs' in words
+    assert 'axion' not in words
+    assert words['dark matter'] == {'term_total': 40, 'doc_total': 10, 'term_freq': 5, 'doc_freq': 2}
+    assert dict(words.items())['higgs'] == {'term_total': 30, 'doc_total': 20, 'term_freq': 1, 'doc_freq': 1}
+
+
+def test_update(statistics):
+    words = statistics({'a': 1, 'b': 2})
+    words.update(statistics({'b': 3, 'c': 1}, {'c': 1}))
+    assert words.documents == 3
+    assert words.terms == ['a', 'b', 'c']
+    assert words['b']['term_freq'] == 5
+    assert words['b']['doc_freq'] == 2
+    assert words['c']['doc_freq'] == 2
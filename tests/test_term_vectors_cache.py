@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Term vectors cache tests."""
+
+from invenio_trends.analysis.term_vectors_cache import TermVectorsCache
+
+vector = {
+    'dark matter': {'term_freq': 2, 'ttf': 40, 'doc_freq': 10},
+    'higgs': {'term_freq': 1, 'ttf': 30, 'doc_freq': 20},
+}
+
+
+def test_read_through(tmpdir):
+    cache = TermVectorsCache(str(tmpdir.join('vectors.db')), {'analyzer': 1})
+    assert dict(cache.get_many(['1', '2'])) == {}
+    cache.put_many([('1', vector)])
+    assert dict(cache.get_many(['1', '2'])) == {'1': vector}
+    assert cache.cached_ids(['1', '2']) == set(['1'])
+
+
+def test_analyzer_change(tmpdir):
+    path = str(tmpdir.join('vectors.db'))
+    TermVectorsCache(path, {'analyzer': 1}).put_many([('1', vector)])
+    assert dict(TermVectorsCache(path, {'analyzer': 1}).get_many(['1'])) == {'1': vector}
+    assert dict(TermVectorsCache(path, {'analyzer': 2}).get_many(['1'])) == {}
+    assert dict(TermVectorsCache(path, {'analyzer': 1}).get_many(['1'])) == {}
+
+
+def test_evict(tmpdir):
+    cache = TermVectorsCache(str(tmpdir.join('vectors.db')), {'analyzer': 1})
+    cache.put_many([('1', vector)])
+    cache.evict(3600)
+    assert dict(cache.get_many(['1'])) == {'1': vector}
+    cache.evict(-1)
+    assert dict(cache.get_many(['1'])) == {}
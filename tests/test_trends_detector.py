@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Trends detector tests."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from invenio_trends.analysis.binning import bin_index
+from invenio_trends.analysis.granularity import Granularity
+from invenio_trends.analysis.term_statistics import TermStatistics
+from invenio_trends.analysis.terms_matrix import TermsMatrix
+from invenio_trends.analysis.trends_detector import TrendsDetector
+from invenio_trends.config import TRENDS_PARAMS
+
+td = TrendsDetector(TRENDS_PARAMS)
+
+origin = bin_index(datetime(2016, 1, 1), Granularity.day)
+reference = origin, np.arange(30) + 10
+hists = [
+    ('a', {'doc_freq': 3}, (origin + 5, np.arange(15) % 4)),
+    ('b', {'doc_freq': 2}, (origin, np.arange(30) % 3)),
+    ('c', {'doc_freq': 1}, (origin, np.array([7]))),
+]
+
+
+def normalize_histogram(hist_numerator, hist_denumerator):
+    """Normalize a single (origin, counts) w.r.t. the reference one, fitted to its size."""
+    origin, y = hist_numerator
+    origin_ref, y_ref = hist_denumerator
+    before_count = origin - origin_ref
+    after_count = len(y_ref) - before_count - len(y)
+    y = np.append(np.zeros(before_count), np.append(y, np.zeros(after_count)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        res = np.divide(y, y_ref)
+        res[~ np.isfinite(res)] = 0
+        return origin_ref, res
+
+
+def transform_score(hist, foreground_start, smoothing_window, granularity):
+    """Score a single histogram using moving average and z-score w.r.t. foreground."""
+    origin, y = hist
+    y_s = np.convolve(y, smoothing_window, mode='valid')
+    invalid = len(y) - len(y_s)
+    invalid_before = invalid // 2
+    invalid_after = invalid_before + invalid % 2
+    origin_s = origin + invalid_before
+    foreground_index = bin_index(foreground_start, granularity) - origin_s
+    zscore = (y_s[foreground_index - invalid_after:] - np.mean(y_s)) / np.std(y_s)
+    return origin_s + foreground_index - invalid_after, zscore
+
+
+def test_align_histograms():
+    matrix = td.align_histograms(hists, reference, Granularity.day)
+    assert matrix.terms == ['a', 'b', 'c']
+    assert matrix.values.shape == (3, 30)
+    assert matrix.dates[0] == np.datetime64('2016-01-01')
+    for row, (term, stats, hist) in enumerate(hists):
+        x, y = normalize_histogram(hist, reference)
+        assert x == matrix.origin
+        assert np.allclose(y, matrix.values[row])
+
+
+def test_matrix_scores():
+    for foreground_start in (datetime(2016, 1, 21), datetime(2016, 1, 21, 15)):
+        matrix = td.matrix_scores(td.align_histograms(hists, reference, Granularity.day), foreground_start, 7)
+        assert matrix.dates[0] == np.datetime64('2016-01-18')
+        for row, (term, stats, hist) in enumerate(hists):
+            x, y = transform_score(normalize_histogram(hist, reference), foreground_start, np.ones(7),
+                                   Granularity.day)
+            assert x == matrix.origin
+            assert np.allclose(y, matrix.values[row])
+
+    # too few bins to smooth
+    short = TermsMatrix(['a'], [{'doc_freq': 3}], origin, Granularity.day, np.ones((1, 7)))
+    assert not len(td.matrix_scores(short, datetime(2016, 1, 5), 7))
+
+
+def test_slice_histogram():
+    start = datetime(2016, 1, 10)
+    origin, y = td.slice_histogram(hists[0][2], start, Granularity.day, Granularity.week)
+    assert origin == bin_index(datetime(2016, 1, 11), Granularity.week)
+    assert np.array_equal(y, [1 + 2 + 3 + 0 + 1 + 2 + 3, 0 + 1 + 2])
+
+
+def test_terms_matrix_select():
+    matrix = TermsMatrix(['a', 'b'], [{}, {}], origin, Granularity.day, np.eye(2))
+    selected = matrix.select(np.array([False, True]))
+    assert selected.terms == ['b']
+    assert np.array_equal(selected.values, [[0, 1]])
+    assert len(TermsMatrix.empty()) == 0
+
+
+def test_sorting_freq_threshold():
+    words = TermStatistics.from_arrays(['a', 'b', 'c', 'd', 'e'], [10] * 5, [10] * 5, [1] * 5, [3, 1, 5, 3, 4], 5)
+    assert [term for term, stats in td.sorting_freq_threshold(words, 2)] == ['c', 'e', 'a', 'd']
+    assert [term for term, stats in td.sorting_freq_threshold(words, 2, 2)] == ['c', 'e']
+    assert td.sorting_freq_threshold(words, 2, 3)[2] == ('a', {'term_total': 10, 'doc_total': 10, 'term_freq': 1,
+                                                               'doc_freq': 3})
+
+
+def test_prune_scores():
+    stats = [{'doc_freq': 1, 'doc_total': 4}, {'doc_freq': 3, 'doc_total': 4}, {'doc_freq': 2, 'doc_total': 4}]
+    scores = TermsMatrix(['a', 'b', 'c'], stats, origin, Granularity.day, np.zeros((3, 1)))
+    assert [term for term, stats, hist in td.prune_scores(scores, 2)] == ['b', 'c']
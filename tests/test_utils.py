@@ -27,7 +27,7 @@
 from datetime import datetime
 
 import numpy as np
-from invenio_trends.utils import parse_iso_date
+from invenio_trends.utils import iso_dates, parse_iso_date
 
 
 def test_parse_iso_date():
@@ -45,3 +45,9 @@ def test_parse_iso_date():
 def test_parse_iso_date_loop():
     date = datetime(2016, 4, 8, 9, 48, 23, 20000)
     assert date == parse_iso_date(date.isoformat())
+
+
+def test_iso_dates():
+    dates = [datetime(2016, 4, 8), datetime(2016, 4, 8, 9, 48, 23)]
+    assert list(iso_dates(dates)) == [date.isoformat() for date in dates]
+    assert list(iso_dates(np.array(dates, dtype='datetime64[ms]'))) == [date.isoformat() for date in dates]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Views tests."""
+
+import json
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from invenio_trends import InvenioTrends, views
+from invenio_trends.analysis.binning import bin_index
+from invenio_trends.config import TRENDS_EMERGING_REDIS_KEY, TRENDS_GRANULARITY
+from invenio_trends.payloads import COLUMNAR_MIMETYPE, GZIP_WBITS, JSON_MIMETYPE, MSGPACK_MIMETYPE, PayloadCache, \
+    search_payload
+from invenio_trends.single_flight import SingleFlight
+
+
+@pytest.fixture()
+def client(app, redis, connections, monkeypatch):
+    InvenioTrends(app).elasticsearch = connections
+    monkeypatch.setattr(views, 'redis', redis)
+    monkeypatch.setattr(views, 'emerging_cache', PayloadCache(redis, TRENDS_EMERGING_REDIS_KEY, True))
+    monkeypatch.setattr(views, 'histogram_cache', None)
+    monkeypatch.setattr(views, 'search_flight', SingleFlight())
+    return app.test_client()
+
+
+def test_emerging(client):
+    origin = bin_index(datetime(2016, 6, 20), TRENDS_GRANULARITY)
+    payload = search_payload([('higgs', (origin, np.array([1, 0, 4])))], granularity=TRENDS_GRANULARITY)
+    views.emerging_cache.store(TRENDS_GRANULARITY, {JSON_MIMETYPE: payload})
+
+    res = client.get('/trends/emerging', headers={'Accept-Encoding': 'gzip'})
+    assert res.status_code == 200
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert res.headers['Cache-Control'] == 'no-cache'
+    assert 'Last-Modified' in res.headers
+    assert json.loads(zlib.decompress(res.data, GZIP_WBITS).decode('utf-8')) == payload
+    etag = res.headers['ETag']
+    assert client.get('/trends/emerging', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code \
+        == 304
+
+    # the plain body is another representation
+    plain = client.get('/trends/emerging')
+    assert 'Content-Encoding' not in plain.headers
+    assert json.loads(plain.data.decode('utf-8')) == payload
+    assert plain.headers['ETag'] != etag
+    assert client.get('/trends/emerging', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/trends/emerging', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    assert json.loads(client.get('/trends/emerging?granularity=month').data.decode('utf-8')) == {}
+    assert client.get('/trends/emerging?granularity=fortnight').status_code == 400
+
+
+def test_search_negotiation(client, monkeypatch):
+    url = '/trends/search/topic 0,topic 1/2016-06-01T00:00:00/2016-07-01T00:00:00/week'
+    res = client.get(url)
+    assert res.mimetype == JSON_MIMETYPE
+    assert 'Accept' in res.headers['Vary']
+    series = json.loads(res.data.decode('utf-8'))['data']
+    assert [data['name'] for data in series] == ['topic 0', 'topic 1']
+    # the bin containing start comes first
+    assert series[0]['series'][0]['date'] == '2016-05-30T00:00:00'
+    month = client.get('/trends/search/topic 0/2016-05-01T00:00:00/2016-07-01T00:00:00/month')
+    assert [point['date'] for point in json.loads(month.data.decode('utf-8'))['data'][0]['series']][:2] == \
+        ['2016-05-01T00:00:00', '2016-06-01T00:00:00']
+
+    res = client.get(url, headers={'Accept': COLUMNAR_MIMETYPE + ', application/json;q=0.5'})
+    assert res.mimetype == COLUMNAR_MIMETYPE
+    columnar = json.loads(res.data.decode('utf-8'))['data']
+    assert columnar[0]['dates'] == [point['date'] for point in series[0]['series']]
+    assert columnar[0]['values'] == [point['value'] for point in series[0]['series']]
+
+    # without msgpack installed, binary responses are not offered
+    monkeypatch.setattr(views, 'MIMETYPES', [JSON_MIMETYPE, COLUMNAR_MIMETYPE])
+    res = client.get(url, headers={'Accept': MSGPACK_MIMETYPE})
+    assert res.mimetype == JSON_MIMETYPE
+    assert json.loads(res.data.decode('utf-8'))['data'] == series
+
+
+def test_search_msgpack(client):
+    msgpack = pytest.importorskip('msgpack')
+    res = client.get('/trends/search/topic 0/2016-06-01T00:00:00/2016-07-01T00:00:00/week',
+                     headers={'Accept': MSGPACK_MIMETYPE})
+    assert res.mimetype == MSGPACK_MIMETYPE
+    data = msgpack.unpackb(res.data, raw=False)['data'][0]
+    dates = np.frombuffer(data['dates'], dtype='<f8').astype(np.int64).astype('datetime64[ms]')
+    assert dates[0] == np.datetime64('2016-05-30')
+
+
+def test_search_max_points(client):
+    url = '/trends/search/topic 0/2016-05-01T00:00:00/2016-07-01T00:00:00/day'
+    assert client.get(url + '?max_points=2').status_code == 400
+    assert client.get(url + '?max_points=many').status_code == 400
+    res = client.get(url + '?max_points=10')
+    assert res.status_code == 200
+    series = json.loads(res.data.decode('utf-8'))['data'][0]['series']
+    assert len(series) == 10
+    assert len(json.loads(client.get(url).data.decode('utf-8'))['data'][0]['series']) > 10